@@ -3,8 +3,7 @@ import asyncio
 from xpo import get_xpo_eta
 from forward import get_forward_eta
 from sefl import get_sefl_eta
-import io
-import sys
+from tracking_result import DELIVERED, IN_TRANSIT
 
 # Load the spreadsheet
 df = pd.read_excel('testing_report.xlsx')
@@ -16,29 +15,20 @@ carrier_col = 'Carrier'
 bol_col = 'Unishippers BOL#'
 pro_col = 'Pro#'
 
-# Helper to capture print output from async tracking functions
+# Look up a shipment and map the result onto the spreadsheet's Status/date columns
 async def get_tracking_status(carrier, tracking):
-    old_stdout = sys.stdout
-    sys.stdout = mystdout = io.StringIO()
-    try:
-        if carrier.lower() == "xpo":
-            await get_xpo_eta(str(tracking))
-        elif "forward" in carrier.lower():
-            await get_forward_eta(str(tracking))
-        elif "sefl" in carrier.lower():
-            await get_sefl_eta(str(tracking))
-        else:
-            print("Unknown carrier")
-    finally:
-        sys.stdout = old_stdout
-    output = mystdout.getvalue().strip()
-    # Parse output: expect "Delivered MM/DD/YYYY" or "eta is MM/DD/YYYY"
-    if output.lower().startswith("delivered"):
-        return "DELIVERED", output.split()[-1]
-    elif output.lower().startswith("eta is"):
-        return "IN TRANSIT", output.split()[-1]
+    if carrier.lower() == "xpo":
+        result = await get_xpo_eta(str(tracking))
+    elif "forward" in carrier.lower():
+        result = await get_forward_eta(str(tracking))
+    elif "sefl" in carrier.lower():
+        result = await get_sefl_eta(str(tracking))
     else:
-        return output, ""
+        return "Unknown carrier", ""
+    if result.status in (DELIVERED, IN_TRANSIT):
+        return result.status, result.date
+    else:
+        return result.message, ""
 
 async def main():
     print("Number of rows in spreadsheet:", len(df))
@@ -2,8 +2,7 @@ import asyncio
 from xpo import get_xpo_eta
 from forward import get_forward_eta
 from sefl import get_sefl_eta
-import io
-import sys
+from tracking_result import DELIVERED, IN_TRANSIT
 import re
 
 # Your provided data as a string
@@ -16,21 +15,19 @@ FORWARD AIR	BLL18833551	93596021
 """
 
 async def get_status(carrier, tracking):
-    old_stdout = sys.stdout
-    sys.stdout = mystdout = io.StringIO()
-    try:
-        if carrier == "xpo":
-            await get_xpo_eta(tracking)
-        elif "forward" in carrier:
-            await get_forward_eta(tracking)
-        elif "sefl" in carrier:
-            await get_sefl_eta(tracking)
-        else:
-            print("Unknown carrier:", carrier)
-    finally:
-        sys.stdout = old_stdout
-    output = mystdout.getvalue().strip().lower()
-    print(f"DEBUG OUTPUT for {carrier} {tracking}:", repr(output))  # Debug line
+    if carrier == "xpo":
+        result = await get_xpo_eta(tracking)
+    elif "forward" in carrier:
+        result = await get_forward_eta(tracking)
+    elif "sefl" in carrier:
+        result = await get_sefl_eta(tracking)
+    else:
+        return f"unknown carrier: {carrier}", ""
+    print(f"DEBUG OUTPUT for {carrier} {tracking}:", repr(result.message))  # Debug line
+    if result.status in (DELIVERED, IN_TRANSIT):
+        return result.status, result.date
+    # No date found: look through the page text the carrier function read
+    output = result.raw_text.lower()
     # --- SEFL: Delivered to Customer ---
     if carrier == "sefl" and "delivered to customer" in output:
         idx = output.find('delivered to customer')
@@ -78,13 +75,7 @@ async def get_status(carrier, tracking):
             return "DELIVERED", date_str
         else:
             return "DELIVERED", ""
-    # Fallback: eta/delivered
-    if output.startswith("delivered"):
-        return "DELIVERED", output.split()[-1]
-    elif output.startswith("eta is"):
-        return "IN TRANSIT", output.split()[-1]
-    else:
-        return output, ""
+    return result.message.lower(), ""
 
 async def main():
     lines = [line.strip() for line in DATA.strip().split('\n') if line.strip()]
@@ -0,0 +1,40 @@
+import functools
+import time
+from dataclasses import dataclass, field
+
+# Result statuses (the first two match the spreadsheet's Status column)
+DELIVERED = 'DELIVERED'
+IN_TRANSIT = 'IN TRANSIT'
+NOT_FOUND = 'NOT FOUND'
+ERROR = 'ERROR'
+
+
+@dataclass
+class TrackingResult:
+    carrier: str
+    pro: str
+    status: str = NOT_FOUND
+    date: str = ''  # delivered date or ETA, MM/DD/YYYY
+    message: str = ''  # one-line summary used in the reports, e.g. "eta is 07/30/2025"
+    raw_text: str = ''  # page text the result was read from
+    timings: dict = field(default_factory=dict)  # seconds per step
+    error: str = ''
+
+    def __str__(self):
+        return self.message
+
+
+def tracked_lookup(carrier):
+    # Decorator for get_*_eta functions: times the lookup and turns exceptions into ERROR results
+    def decorate(lookup):
+        @functools.wraps(lookup)
+        async def wrapper(pro, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await lookup(pro, *args, **kwargs)
+            except Exception as e:
+                result = TrackingResult(carrier, pro, ERROR, message=f"Error: {str(e)}", error=str(e))
+            result.timings['total'] = round(time.perf_counter() - started, 3)
+            return result
+        return wrapper
+    return decorate
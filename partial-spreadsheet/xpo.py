@@ -2,13 +2,15 @@ import asyncio
 from playwright.async_api import async_playwright
 import re
 from datetime import datetime
+from tracking_result import TrackingResult, IN_TRANSIT, NOT_FOUND, tracked_lookup
 
+@tracked_lookup('XPO')
 async def get_xpo_eta(tracking_number):
     url = f"https://ext-web.ltl-xpo.com/public-app/shipments?referenceNumber={tracking_number}"
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=False)
-        page = await browser.new_page()
         try:
+            page = await browser.new_page()
             await page.goto(url, timeout=90000)
             # Wait for the 'Shipment Details' tab to be visible and click it
             try:
@@ -46,12 +48,9 @@ async def get_xpo_eta(tracking_number):
                     else:
                         yyyy = 1900 + year
                     date_str = f"{mm}/{dd}/{yyyy}"
-                print(f"eta is {date_str}")
-            else:
-                print("Could not find Estimated Delivery Date in page text.")
-                print(all_text)
-        except Exception as e:
-            print(f"Error: {str(e)}")
+                return TrackingResult('XPO', tracking_number, IN_TRANSIT, date_str, f"eta is {date_str}", all_text)
+            return TrackingResult('XPO', tracking_number, NOT_FOUND,
+                                  message="Could not find Estimated Delivery Date in page text.", raw_text=all_text)
         finally:
             await browser.close()
 
@@ -60,6 +59,9 @@ if __name__ == "__main__":
     import sys
     tracking = sys.argv[1] if len(sys.argv) > 1 else ""
     if tracking:
-        asyncio.run(get_xpo_eta(tracking))
+        result = asyncio.run(get_xpo_eta(tracking))
+        print(result)
+        if result.status == NOT_FOUND:
+            print(result.raw_text)
     else:
-        print("Usage: python xpo.py <tracking_number>")
\ No newline at end of file
+        print("Usage: python xpo.py <tracking_number>")
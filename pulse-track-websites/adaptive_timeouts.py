@@ -0,0 +1,125 @@
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from tracking_result import current_carrier
+from json_state import load_state, save_state
+
+# --- CONFIG ---
+ADAPTIVE_TIMEOUTS = os.getenv('TRACKING_ADAPTIVE_TIMEOUTS', '1') == '1'
+# Recent step latencies per carrier, carried from run to run
+LATENCY_HISTORY_PATH = os.getenv('TRACKING_LATENCY_HISTORY', 'tracking_latency.json')
+# Successful samples kept per carrier and step (oldest dropped first)
+LATENCY_WINDOW = int(os.getenv('TRACKING_LATENCY_WINDOW', '200'))
+# Samples needed before a step's timeout comes from its history instead of the caller's default
+MIN_SAMPLES = int(os.getenv('TRACKING_TIMEOUT_MIN_SAMPLES', '20'))
+# Timeout = this percentile of the recent latencies x TIMEOUT_FACTOR, clamped to [TIMEOUT_MIN_MS, TIMEOUT_MAX_MS]
+TIMEOUT_PERCENTILE = float(os.getenv('TRACKING_TIMEOUT_PERCENTILE', '99'))
+TIMEOUT_FACTOR = float(os.getenv('TRACKING_TIMEOUT_FACTOR', '3'))
+TIMEOUT_MIN_MS = int(os.getenv('TRACKING_TIMEOUT_MIN_MS', '5000'))
+TIMEOUT_MAX_MS = int(os.getenv('TRACKING_TIMEOUT_MAX_MS', '120000'))
+
+
+def percentile(values, p):
+    # Nearest-rank percentile, p in 0-100
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+class LatencyHistory:
+    """Rolling window of successful step latencies per (carrier, step), and the timeouts derived from it.
+
+    Steps are the page waits the scrapers make ('goto', 'wait_results', ...). Until a step has
+    MIN_SAMPLES samples its timeout is the default the caller passes; after that it is the
+    TIMEOUT_PERCENTILE latency times TIMEOUT_FACTOR, so a healthy carrier gives up on a hung page
+    quickly and a slow but working one is not cut off. A hard step (one the lookup cannot go on
+    without, like the page load) that times out is recorded at its timeout, so a carrier that got
+    slower than its learned timeout pushes it back up. Soft waits, where a missing selector is a
+    normal answer (an unknown PRO, a page without the tab), only ever record successes.
+    """
+
+    def __init__(self, path=LATENCY_HISTORY_PATH, enabled=ADAPTIVE_TIMEOUTS):
+        self.path = path
+        self.enabled = enabled
+        self.samples = None  # loaded on first use
+
+    def _load(self):
+        self.samples = {}
+        saved = load_state(self.path, 'latency history', {})
+        for carrier, steps in saved.items():
+            for step, values in steps.items():
+                self.samples[(carrier, step)] = deque(values, maxlen=LATENCY_WINDOW)
+
+    def record(self, carrier, step, seconds):
+        if not self.enabled or carrier is None:
+            return
+        if self.samples is None:
+            self._load()
+        self.samples.setdefault((carrier, step), deque(maxlen=LATENCY_WINDOW)).append(round(seconds, 3))
+
+    def timeout(self, carrier, step, default):
+        # Milliseconds to allow for this step; `default` (ms) while there is too little history
+        if not self.enabled or carrier is None:
+            return default
+        if self.samples is None:
+            self._load()
+        values = self.samples.get((carrier, step))
+        if not values or len(values) < MIN_SAMPLES:
+            return default
+        adapted = percentile(values, TIMEOUT_PERCENTILE) * TIMEOUT_FACTOR * 1000
+        return int(min(max(adapted, TIMEOUT_MIN_MS), TIMEOUT_MAX_MS))
+
+    def save(self):
+        if not self.enabled or self.samples is None:
+            return
+        saved = {}
+        for (carrier, step), values in self.samples.items():
+            saved.setdefault(carrier, {})[step] = list(values)
+        save_state(self.path, saved)
+
+    def summary(self):
+        if not self.samples:
+            return ''
+        adapted = []
+        for (carrier, step), values in sorted(self.samples.items()):
+            if len(values) >= MIN_SAMPLES:
+                adapted.append(f"{carrier} {step} {self.timeout(carrier, step, 0) / 1000:.1f}s")
+        if not adapted:
+            return ''
+        return "Adaptive timeouts: " + ", ".join(adapted)
+
+
+# Shared by every lookup in the run; the orchestrators save it at the end
+TIMEOUTS = LatencyHistory()
+
+
+def step_timeout(step, default):
+    # Timeout (ms) for one step of the lookup running in the current task
+    return TIMEOUTS.timeout(current_carrier(), step, default)
+
+
+def record_step(step, seconds):
+    TIMEOUTS.record(current_carrier(), step, seconds)
+
+
+def record_timeout(step, timeout):
+    # The step took at least `timeout` ms; without this sample a timeout that is now too short never grows again
+    record_step(step, timeout / 1000)
+
+
+@contextmanager
+def timed_step(step, default, hard=False):
+    # with timed_step('goto', 30000, hard=True) as timeout: await page.goto(url, timeout=timeout)
+    # Records the step's latency when it succeeds. A hard step also records its timeout when it times out;
+    # other errors, and timeouts of soft steps, say nothing about how long the step should take.
+    timeout = step_timeout(step, default)
+    started = time.perf_counter()
+    try:
+        yield timeout
+    except PlaywrightTimeoutError:
+        if hard:
+            record_timeout(step, timeout)
+        raise
+    record_step(step, time.perf_counter() - started)
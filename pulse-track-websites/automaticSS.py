@@ -1,10 +1,11 @@
 import pandas as pd
 import asyncio
-from xpo import get_xpo_eta
-from forward import get_forward_eta
-from sefl import get_sefl_eta
-import io
-import sys
+from carriers import find_carrier
+from browser_pool import BrowserPool
+from run_summary import finish_run
+from http_client import HttpClient
+from result_cache import ResultCache
+from tracking_result import DELIVERED, IN_TRANSIT
 
 # Load the spreadsheet
 df = pd.read_excel('testing_report.xlsx')
@@ -16,49 +17,40 @@ carrier_col = 'Carrier'
 bol_col = 'Unishippers BOL#'
 pro_col = 'Pro#'
 
-# Helper to capture print output from async tracking functions
-async def get_tracking_status(carrier, tracking):
-    old_stdout = sys.stdout
-    sys.stdout = mystdout = io.StringIO()
-    try:
-        if carrier.lower() == "xpo":
-            await get_xpo_eta(str(tracking))
-        elif "forward" in carrier.lower():
-            await get_forward_eta(str(tracking))
-        elif "sefl" in carrier.lower():
-            await get_sefl_eta(str(tracking))
-        else:
-            print("Unknown carrier")
-    finally:
-        sys.stdout = old_stdout
-    output = mystdout.getvalue().strip()
-    # Parse output: expect "Delivered MM/DD/YYYY" or "eta is MM/DD/YYYY"
-    if output.lower().startswith("delivered"):
-        return "DELIVERED", output.split()[-1]
-    elif output.lower().startswith("eta is"):
-        return "IN TRANSIT", output.split()[-1]
+# Look up a shipment and map the result onto the spreadsheet's Status/date columns
+async def get_tracking_status(carrier, tracking, pool=None, http=None, cache=None):
+    carrier = find_carrier(carrier)
+    if carrier is None:
+        return "Unknown carrier", ""
+    result = await carrier.lookup()(str(tracking), pool=pool, http=http, cache=cache)
+    if result.status in (DELIVERED, IN_TRANSIT):
+        return result.status, result.date
     else:
-        return output, ""
+        return result.message, ""
 
 async def main():
     print("Number of rows in spreadsheet:", len(df))
     # Find rows where Status is blank or NaN
     blank_status = df[df[status_col].isna() | (df[status_col].astype(str).str.strip() == '')]
     print(f"Updating {len(blank_status)} rows with blank Status.")
-    for idx, row in blank_status.iterrows():
-        carrier = str(row[carrier_col]).strip()
-        tracking = str(row[pro_col]).strip()
-        if not carrier or not tracking or carrier.lower() == 'nan' or tracking.lower() == 'nan':
-            print(f"Skipping row {idx+1}: missing carrier or tracking number")
-            continue
-        status, date = await get_tracking_status(carrier, tracking)
-        df.at[idx, status_col] = status
-        df.at[idx, date_col] = date
-        print(f"Row {idx+1}: {carrier} {tracking} -> {status}, {date}")
+    with ResultCache() as cache:
+        async with BrowserPool() as pool, HttpClient() as http:
+            for idx, row in blank_status.iterrows():
+                carrier = str(row[carrier_col]).strip()
+                tracking = str(row[pro_col]).strip()
+                if not carrier or not tracking or carrier.lower() == 'nan' or tracking.lower() == 'nan':
+                    print(f"Skipping row {idx+1}: missing carrier or tracking number")
+                    continue
+                status, date = await get_tracking_status(carrier, tracking, pool=pool, http=http, cache=cache)
+                df.at[idx, status_col] = status
+                df.at[idx, date_col] = date
+                print(f"Row {idx+1}: {carrier} {tracking} -> {status}, {date}")
+        print(cache.summary())
 
     # Save the updated file
     df.to_excel('testing report updated.xlsx', index=False)
     print("Updated file saved as 'testing report updated.xlsx'.")
+    finish_run()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,74 @@
+import os
+import re
+
+# --- CONFIG ---
+# Most PROs submitted in one page load for carriers that accept a list
+BATCH_SIZE = int(os.getenv('TRACKING_BATCH_SIZE', '10'))
+
+
+def chunked(items, size=BATCH_SIZE):
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), max(1, size))]
+
+
+def plan_batches(items, batch_key, size=BATCH_SIZE, sizes=None):
+    # Group items sharing a batch key (e.g. the carrier's batch function) into chunks of `size`,
+    # or of sizes[key] when given (None there means no limit: one group for every item with that key).
+    # Items whose key is None become groups of one. Groups keep the order items first appear in.
+    sizes = sizes or {}
+    groups = []
+    open_groups = {}
+    for item in items:
+        key = batch_key(item)
+        if key is None:
+            groups.append([item])
+            continue
+        limit = sizes.get(key, size)
+        group = open_groups.get(key)
+        if group is None or (limit is not None and len(group) >= limit):
+            group = []
+            open_groups[key] = group
+            groups.append(group)
+        group.append(item)
+    return groups
+
+
+def stream_batches(items, batch_key, size=BATCH_SIZE, sizes=None):
+    # Streaming plan_batches: yields each group as soon as it is full (items with no key at once)
+    # and the partly filled groups when items run out, so only the open groups are held in memory.
+    sizes = sizes or {}
+    open_groups = {}
+    for item in items:
+        key = batch_key(item)
+        if key is None:
+            yield [item]
+            continue
+        group = open_groups.setdefault(key, [])
+        group.append(item)
+        limit = sizes.get(key, size)
+        if limit is not None and len(group) >= limit:
+            yield open_groups.pop(key)
+    yield from open_groups.values()
+
+
+def find_reference(text, ref):
+    # Index of the first mention of `ref` in text that is not part of a longer number, or -1
+    # (so PRO 123 is not found inside 1234 or 51234)
+    match = re.search(rf'(?<!\d){re.escape(ref)}(?!\d)', text)
+    return match.start() if match else -1
+
+
+def split_by_reference(text, references):
+    # Split a multi-shipment results page into one chunk of text per reference number.
+    # Each chunk runs from the reference's first mention up to the next reference's mention.
+    positions = []
+    for ref in references:
+        index = find_reference(text, ref)
+        if index >= 0:
+            positions.append((index, ref))
+    positions.sort()
+    chunks = {ref: '' for ref in references}
+    for i, (start, ref) in enumerate(positions):
+        end = positions[i + 1][0] if i + 1 < len(positions) else len(text)
+        chunks[ref] = text[start:end]
+    return chunks
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from fixture_server import FixtureServer, LATENCY, LATENCY_JITTER, OPERATOR_DELAY
+
+try:
+    import psutil
+except ImportError:  # optional: without it peak RSS covers this process only, not the browsers
+    psutil = None
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+# --- CONFIG ---
+# Saia is left out by default: its browser is always headed, so it needs a display
+DEFAULT_CARRIERS = ['XPO', 'FORWARD AIR', 'SEFL', 'R&L']
+# Seconds between RSS samples
+RSS_INTERVAL = 0.2
+
+
+def percentile(values, p):
+    # Nearest-rank percentile, p in 0-100
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+class RssSampler:
+    """Samples resident memory of this process and its children (the browsers) on a thread; keeps the peak."""
+
+    def __init__(self, interval=RSS_INTERVAL):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        process = psutil.Process()
+        while not self._stop.is_set():
+            total = 0
+            for proc in [process] + process.children(recursive=True):
+                try:
+                    total += proc.memory_info().rss
+                except psutil.Error:
+                    pass  # exited between listing and reading
+            self.peak = max(self.peak, total)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if psutil is not None:
+            self._thread = threading.Thread(target=self._sample, name='rss-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        elif resource is not None:
+            # ru_maxrss is KB on Linux, bytes on macOS
+            scale = 1 if sys.platform == 'darwin' else 1024
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    def describe(self):
+        if psutil is None:
+            return "this process only (pip install psutil to include the browsers)"
+        return "process and browsers"
+
+
+def make_pros(carrier, count):
+    prefix = ''.join(c for c in carrier if c.isalnum())[:3].upper()
+    return [f"{prefix}{i:07d}" for i in range(1, count + 1)]
+
+
+async def run_benchmark(args):
+    # The carrier modules read their URLs and limits when imported, so everything is imported here,
+    # after main() has pointed the environment at the fixture server
+    from browser_pool import BrowserPool
+    from http_client import HttpClient
+    from carriers import find_carrier, batch_sizes
+    from scheduler import run_all
+    from batching import plan_batches
+
+    jobs = [{'carrier': find_carrier(name).name, 'pro': pro}
+            for name in args.carriers for pro in make_pros(name, args.shipments)]
+
+    def batch_key(job):
+        carrier = find_carrier(job['carrier'])
+        return carrier.name if args.batch and carrier.batch_name else None
+
+    async def track(group, pool, http):
+        carrier = find_carrier(group[0]['carrier'])
+        if batch_key(group[0]):
+            results = await carrier.batch_lookup()([j['pro'] for j in group], pool=pool, http=http)
+        else:
+            results = {group[0]['pro']: await carrier.lookup()(group[0]['pro'], pool=pool, http=http)}
+        for job in group:
+            job['result'] = results[job['pro']]
+
+    groups = plan_batches(jobs, batch_key, sizes=batch_sizes())
+    started = time.perf_counter()
+    async with BrowserPool(size=args.pool_size, headless=not args.headed) as pool, HttpClient() as http:
+        await run_all(groups, lambda g: track(g, pool, http), lambda g: g[0]['carrier'],
+                      global_limit=args.concurrency)
+        launches = pool.launches
+    return jobs, time.perf_counter() - started, launches
+
+
+def report(jobs, wall, launches, rss, server_requests):
+    print()
+    print(f"{'carrier':<12} {'n':>4} {'ok':>4} {'p50 s':>7} {'p95 s':>7} {'max s':>7}")
+    for carrier in dict.fromkeys(job['carrier'] for job in jobs):
+        results = [job['result'] for job in jobs if job['carrier'] == carrier]
+        latencies = [r.timings.get('total', 0.0) for r in results]
+        found = sum(1 for r in results if r.date)
+        print(f"{carrier:<12} {len(results):>4} {found:>4} {percentile(latencies, 50):>7.2f} "
+              f"{percentile(latencies, 95):>7.2f} {max(latencies):>7.2f}")
+    print()
+    print(f"Shipments:       {len(jobs)} in {wall:.1f}s = {len(jobs) / wall * 60:.0f} shipments/min")
+    print(f"Browser launches: {launches}")
+    print(f"Site requests:   {server_requests}")
+    print(f"Peak RSS:        {rss.peak / 1_000_000:.0f} MB ({rss.describe()})")
+    failures = [job for job in jobs if not job['result'].date]
+    for job in failures[:5]:
+        print(f"  no date for {job['carrier']} {job['pro']}: {job['result'].message}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the carrier lookups against the offline fixture server.",
+        epilog="Transport, capture and pool settings come from the usual environment variables "
+               "(SEFL_TRANSPORT, RL_TRANSPORT, XPO_HTTP, TRACKING_CAPTURE_RESPONSES, TRACKING_PAGE_SESSIONS, ...).")
+    parser.add_argument('--carriers', nargs='+', default=DEFAULT_CARRIERS,
+                        help="carriers to track (any name or alias the registry knows)")
+    parser.add_argument('--shipments', type=int, default=20, help="PROs per carrier")
+    parser.add_argument('--latency', type=float, default=LATENCY, help="seconds the fixture server adds per response")
+    parser.add_argument('--jitter', type=float, default=LATENCY_JITTER)
+    parser.add_argument('--operator-delay', type=float, default=OPERATOR_DELAY,
+                        help="seconds the stand-in operator takes on the Saia captcha")
+    parser.add_argument('--concurrency', type=int, default=None, help="lookups at once (default TRACKING_CONCURRENCY)")
+    parser.add_argument('--pool-size', type=int, default=None, help="pooled browsers (default TRACKING_POOL_SIZE)")
+    parser.add_argument('--no-batch', dest='batch', action='store_false', help="one lookup per PRO")
+    parser.add_argument('--headed', action='store_true', help="show the browsers")
+    parser.add_argument('--rate-limit', action='store_true',
+                        help="keep the per-carrier rate limits (off by default: the fixture server is local)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with FixtureServer(latency=args.latency, jitter=args.jitter, operator_delay=args.operator_delay) as server:
+        # Point every carrier at the fixture server, and keep the cache and breaker from skewing the numbers
+        os.environ['TRACKING_SITE_BASE_URL'] = server.base_url
+        os.environ['TRACKING_CACHE'] = '0'
+        os.environ['TRACKING_BREAKER'] = '0'
+        if not args.rate_limit:
+            os.environ['TRACKING_RATE_LIMIT'] = '0'
+        if args.pool_size is None:
+            from browser_pool import POOL_SIZE
+            args.pool_size = POOL_SIZE
+        print(f"Fixture server at {server.base_url}, {args.latency:.2f}s latency; "
+              f"{args.shipments} PRO(s) each for {', '.join(args.carriers)}")
+        with RssSampler() as rss:
+            jobs, wall, launches = asyncio.run(run_benchmark(args))
+        report(jobs, wall, launches, rss, server.requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from request_blocking import install_blocking
+from tracking_result import span, hold_capture, record_timing
+from lookup_profiler import PROFILE_ENABLED, open_recorded_context, close_recorded_context, discard_captures
+
+# --- CONFIG ---
+# Number of warm browsers kept open for a whole tracking run
+POOL_SIZE = int(os.getenv('TRACKING_POOL_SIZE', '3'))
+# Pages served by one browser context before it is thrown away and recreated
+CONTEXT_MAX_USES = int(os.getenv('TRACKING_CONTEXT_MAX_USES', '20'))
+# Run the scrapers without a visible window (unattended runs)
+HEADLESS = os.getenv('TRACKING_HEADLESS', '0') == '1'
+# Carriers that always get a visible window of their own, because someone has to solve a captcha in it
+HEADED_CARRIERS = {'SAIA'}
+# Chromium flags that cut CPU and memory in headless runs
+LEAN_LAUNCH_ARGS = [
+    '--disable-gpu',
+    '--disable-dev-shm-usage',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--metrics-recording-only',
+    '--mute-audio',
+    '--no-first-run',
+]
+# Small viewport for headless pages: less to lay out and paint
+HEADLESS_VIEWPORT = {'width': 1024, 'height': 768}
+
+
+def is_headless(carrier, headless=HEADLESS):
+    return headless and carrier not in HEADED_CARRIERS
+
+
+def launch_options(headless):
+    if headless:
+        return {'headless': True, 'args': LEAN_LAUNCH_ARGS}
+    return {'headless': False}
+
+
+def context_options(headless):
+    return {'viewport': HEADLESS_VIEWPORT} if headless else {}
+
+
+async def _finish_recording(context, capture_dir):
+    # The running lookup decides whether the capture is kept; outside one there is nobody to ask
+    await close_recorded_context(context, capture_dir)
+    if not hold_capture(capture_dir):
+        discard_captures([capture_dir])
+
+
+class _Slot:
+    def __init__(self, headless):
+        self.headless = headless
+        self.browser = None
+        self.context = None
+        self.uses = 0
+        self.parked = {}  # carrier -> page left open by its last lookup (page sessions)
+
+
+class BrowserPool:
+    """Keeps a few Chromium browsers open and hands out pages from recycled contexts.
+
+    Browsers are launched on first use, so a run answered entirely from the cache never starts one.
+    Carriers in HEADED_CARRIERS get one extra visible browser of their own, so a page waiting on
+    the operator never holds up a shared browser.
+    With profile=True every page gets a fresh context that records a Playwright trace and a HAR
+    (see lookup_profiler); the capture is kept only if the lookup turns out slow or failed.
+    page(carrier, keep=True) leaves the page open on its browser when the lookup ends cleanly, and
+    the next keep=True lookup for that carrier on the same browser gets it back still loaded
+    (see page_sessions). Parked pages go when their context is recycled.
+
+    Create it once per run and pass it to the get_*_eta functions:
+
+        async with BrowserPool() as pool:
+            await get_xpo_eta(pro, pool=pool)
+    """
+
+    def __init__(self, size=POOL_SIZE, context_max_uses=CONTEXT_MAX_USES, headless=HEADLESS, profile=PROFILE_ENABLED):
+        self.size = max(1, size)
+        self.context_max_uses = max(1, context_max_uses)
+        self.headless = headless
+        self.profile = profile
+        self.launches = 0
+        self._playwright = None
+        self._start_lock = None
+        self._slots = {'shared': [], 'operator': []}
+        self._idle = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self):
+        self._idle = {lane: asyncio.Queue() for lane in self._slots}
+        self._start_lock = asyncio.Lock()
+
+    async def close(self):
+        for slots in self._slots.values():
+            for slot in slots:
+                if slot.browser is None:
+                    continue
+                try:
+                    await slot.browser.close()
+                except Exception:
+                    pass
+        self._slots = {lane: [] for lane in self._slots}
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _launch(self, headless):
+        async with self._start_lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+        self.launches += 1
+        return await self._playwright.chromium.launch(**launch_options(headless))
+
+    async def _browser_for(self, slot):
+        # Launch on first use and relaunch a browser that crashed
+        if slot.browser is None or not slot.browser.is_connected():
+            slot.browser = await self._launch(slot.headless)
+            slot.context = None
+            slot.uses = 0
+        return slot.browser
+
+    async def _context_for(self, slot):
+        # Recycle contexts that have served enough pages
+        await self._browser_for(slot)
+        if slot.context is not None and slot.uses >= self.context_max_uses:
+            try:
+                await slot.context.close()
+            except Exception:
+                pass
+            slot.context = None
+        if slot.context is None:
+            slot.context = await slot.browser.new_context(**context_options(slot.headless))
+            slot.uses = 0
+        slot.uses += 1
+        return slot.context
+
+    @asynccontextmanager
+    async def page(self, carrier=None, keep=False):
+        # Pages come with request blocking installed (a parked page still has it from its first lookup)
+        keep = keep and not self.profile
+        lane, size = ('operator', 1) if carrier in HEADED_CARRIERS else ('shared', self.size)
+        slots, idle = self._slots[lane], self._idle[lane]
+        if idle.empty() and len(slots) < size:
+            slot = _Slot(is_headless(carrier, self.headless))
+            slots.append(slot)
+        else:
+            slot = await idle.get()
+        page = None
+        recorded = None
+        parked = False
+        try:
+            with span('launch'):
+                if self.profile:
+                    # A context of its own, so the trace and HAR cover this page only
+                    context, recorded = await open_recorded_context(await self._browser_for(slot),
+                                                                    context_options(slot.headless))
+                else:
+                    context = await self._context_for(slot)
+                page = slot.parked.pop(carrier, None) if keep else None
+                if page is not None and not page.is_closed() and page.context is context:
+                    record_timing('page_reused', 1)
+                else:
+                    page = await context.new_page()
+                    await install_blocking(page, carrier)
+            yield page
+            # Only a lookup that finished cleanly leaves the page in a state worth reusing
+            parked = keep
+        finally:
+            if parked:
+                slot.parked[carrier] = page
+            else:
+                with span('close'):
+                    if page is not None:
+                        try:
+                            await page.close()
+                        except Exception:
+                            pass
+                    if recorded is not None:
+                        await _finish_recording(context, recorded)
+            idle.put_nowait(slot)
+
+
+@asynccontextmanager
+async def open_page(pool=None, carrier=None, headless=HEADLESS, keep=False):
+    # Borrow a page from the shared pool, or launch a one-off browser when called standalone.
+    # Requests the carrier's scraper never reads (images, fonts, trackers) are blocked.
+    # keep=True asks the pool for the carrier's parked page, see BrowserPool.page.
+    if pool is not None:
+        async with pool.page(carrier, keep=keep) as page:
+            yield page
+        return
+    headless = is_headless(carrier, headless)
+    async with async_playwright() as p:
+        with span('launch'):
+            browser = await p.chromium.launch(**launch_options(headless))
+        recorded = None
+        try:
+            with span('launch'):
+                if PROFILE_ENABLED:
+                    context, recorded = await open_recorded_context(browser, context_options(headless))
+                    page = await context.new_page()
+                else:
+                    page = await browser.new_page(**context_options(headless))
+                await install_blocking(page, carrier)
+            yield page
+        finally:
+            with span('close'):
+                if recorded is not None:
+                    await _finish_recording(context, recorded)
+                await browser.close()
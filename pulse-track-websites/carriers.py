@@ -0,0 +1,97 @@
+import functools
+import importlib
+import os
+import re
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+
+# --- CONFIG ---
+# Serve every carrier site from here instead (e.g. the offline fixture server): https://host/path -> <base>/host/path
+SITE_BASE_URL = os.getenv('TRACKING_SITE_BASE_URL', '').rstrip('/')
+# PROs per Saia trace; 0 puts every Saia PRO in the run on one page, so one captcha covers them all
+SAIA_BATCH_SIZE = int(os.getenv('TRACKING_SAIA_BATCH_SIZE', '0'))
+
+
+@dataclass(frozen=True)
+class Carrier:
+    name: str  # canonical name, the one TrackingResult.carrier and the per-carrier settings use
+    module: str  # carrier module, imported the first time one of its shipments comes up
+    lookup_name: str  # get_*_eta(pro, pool=None, http=None, cache=None)
+    batch_name: str = None  # get_*_etas(pros, ...) for tracking pages that take several PROs
+    aliases: tuple = ()  # other spellings seen in the portal exports and spreadsheets
+    tracking_url: str = ''
+    needs_operator: bool = False  # a person has to step in (captcha), see operator_queue.py
+    batch_size: int = 0  # PROs per batch lookup: 0 for batching.BATCH_SIZE, None for no limit
+
+    def lookup(self):
+        return getattr(importlib.import_module(self.module), self.lookup_name)
+
+    def batch_lookup(self):
+        if self.batch_name is None:
+            return None
+        return getattr(importlib.import_module(self.module), self.batch_name)
+
+
+CARRIERS = [
+    Carrier('XPO', 'xpo', 'get_xpo_eta',
+            aliases=('XPO LOGISTICS', 'XPO LTL'),
+            tracking_url='https://www.xpo.com/track/'),
+    Carrier('FORWARD AIR', 'forward', 'get_forward_eta', 'get_forward_etas',
+            aliases=('FORWARD', 'FORWARD AIR INC'),
+            tracking_url='https://www.forwardair.com/tracking'),
+    Carrier('SEFL', 'sefl', 'get_sefl_eta', 'get_sefl_etas',
+            aliases=('SOUTHEASTERN FREIGHT LINES', 'SOUTHEASTERN'),
+            tracking_url='https://sefl.com/Tracing/index.jsp'),
+    Carrier('R&L', 'rnl', 'get_rl_eta',
+            aliases=('RL CARRIERS', 'R&L CARRIERS', 'R+L CARRIERS', 'RL'),
+            tracking_url='https://www2.rlcarriers.com/freight/shipping/shipment-tracing'),
+    Carrier('SAIA', 'saia', 'get_saia_eta', 'get_saia_etas',
+            aliases=('SAIA LTL FREIGHT', 'SAIA INC'),
+            tracking_url='https://www.saia.com/track', needs_operator=True,
+            batch_size=SAIA_BATCH_SIZE or None),
+]
+
+
+def site_url(url):
+    # Live carrier URL, or its stand-in under SITE_BASE_URL. The live host stays in the path,
+    # so the URL checks the scrapers make ('forwardair.com' in url, ...) still match.
+    if not SITE_BASE_URL:
+        return url
+    parts = urlsplit(url)
+    return f"{SITE_BASE_URL}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else '')
+
+
+def normalize_carrier(name):
+    # "  Southeastern  Freight Lines, Inc. " -> "SOUTHEASTERN FREIGHT LINES INC"
+    name = re.sub(r'[.,]', '', str(name).upper())
+    return ' '.join(name.split())
+
+
+# Every canonical name and alias, normalized, mapped to its carrier
+_BY_NAME = {normalize_carrier(alias): carrier
+            for carrier in CARRIERS for alias in (carrier.name,) + carrier.aliases}
+
+
+@functools.lru_cache(maxsize=None)
+def find_carrier(name):
+    # Exact match on a known name or alias; otherwise the first alias contained in the name
+    # (e.g. "XPO LOGISTICS FREIGHT INC"), as the old substring checks did. None for unknown carriers.
+    name = normalize_carrier(name)
+    if name in _BY_NAME:
+        return _BY_NAME[name]
+    for alias, carrier in _BY_NAME.items():
+        if len(alias) > 2 and alias in name:
+            return carrier
+    return None
+
+
+def batch_sizes():
+    # Batch size overrides by canonical name, for batching.plan_batches(sizes=...)
+    return {carrier.name: carrier.batch_size for carrier in CARRIERS if carrier.batch_size != 0}
+
+
+def canonical_name(name):
+    # Canonical carrier name, or the normalized input when the carrier is unknown
+    carrier = find_carrier(name)
+    return carrier.name if carrier else normalize_carrier(name)
@@ -0,0 +1,82 @@
+import os
+import time
+
+# --- CONFIG ---
+BREAKER_ENABLED = os.getenv('TRACKING_BREAKER', '1') == '1'
+# Consecutive failed lookups (after retries) that mark a carrier's site as down
+FAILURE_THRESHOLD = int(os.getenv('TRACKING_BREAKER_THRESHOLD', '3'))
+# Seconds to fail that carrier's lookups fast before letting one probe lookup through
+COOLDOWN = float(os.getenv('TRACKING_BREAKER_COOLDOWN', '120'))
+
+
+class CarrierUnavailableError(Exception):
+    def __init__(self, carrier):
+        super().__init__(f"{carrier} unavailable: tracking site is failing, lookup skipped")
+        self.carrier = carrier
+
+
+class _Circuit:
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None  # set while the circuit is open
+        self.probing = False
+        self.trips = 0
+        self.skipped = 0
+
+
+class CircuitBreakers:
+    """One circuit per carrier.
+
+    After `threshold` consecutive failures the circuit opens and allow() refuses that carrier's
+    lookups. Once `cooldown` seconds have passed, a single probe lookup is let through: success
+    closes the circuit, failure opens it for another cooldown.
+    """
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN, enabled=BREAKER_ENABLED):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.enabled = enabled
+        self.circuits = {}
+
+    def _circuit(self, carrier):
+        return self.circuits.setdefault(carrier, _Circuit())
+
+    def allow(self, carrier):
+        if not self.enabled:
+            return True
+        circuit = self._circuit(carrier)
+        if circuit.opened_at is None:
+            return True
+        if not circuit.probing and time.monotonic() - circuit.opened_at >= self.cooldown:
+            circuit.probing = True
+            print(f"{carrier}: cooldown over, probing the tracking site")
+            return True
+        circuit.skipped += 1
+        return False
+
+    def record_success(self, carrier):
+        circuit = self._circuit(carrier)
+        if circuit.opened_at is not None:
+            print(f"{carrier}: tracking site is back")
+        circuit.failures = 0
+        circuit.opened_at = None
+        circuit.probing = False
+
+    def record_failure(self, carrier):
+        circuit = self._circuit(carrier)
+        circuit.failures += 1
+        if circuit.probing or (circuit.opened_at is None and circuit.failures >= self.threshold):
+            if circuit.opened_at is None:
+                circuit.trips += 1
+                print(f"{carrier}: {circuit.failures} failed lookups in a row, "
+                      f"skipping it for {self.cooldown:.0f}s")
+            circuit.opened_at = time.monotonic()
+            circuit.probing = False
+
+    def summary(self):
+        tripped = [f"{carrier} ({c.skipped} skipped)" for carrier, c in self.circuits.items() if c.trips]
+        return f"Unavailable carriers: {', '.join(tripped)}" if tripped else ''
+
+
+# Circuits for the whole run, shared by every lookup
+BREAKERS = CircuitBreakers()
@@ -0,0 +1,86 @@
+import dataclasses
+import hashlib
+import json
+import math
+import os
+import time
+from tracking_result import TrackingResult, ERROR
+from json_state import load_state, save_state
+
+# --- CONFIG ---
+DELTA_ENABLED = os.getenv('TRACKING_DELTA', '0') == '1'
+# Where the previous export's row fingerprints and results are kept
+DELTA_STATE_PATH = os.getenv('TRACKING_DELTA_STATE', 'last_export_state.json')
+# Seconds before an unchanged row is tracked again anyway
+DELTA_REFRESH = float(os.getenv('TRACKING_DELTA_REFRESH', str(2 * 3600)))
+# pandas.read_csv options both orchestrators read the export with, so they fingerprint a row the same way
+# (every column as text: one empty PRO in the file must not turn the others into floats)
+EXPORT_READ_OPTIONS = {'dtype': str}
+
+
+def _normalize(value):
+    # Text as it appears in the export: empty cells read as NaN/None count as '', surrounding spaces don't count
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def row_fingerprint(row):
+    # Hash of every column in the export row, so any edit on the portal side shows up as a change
+    values = {str(k): _normalize(v) for k, v in dict(row).items()}
+    return hashlib.sha1(json.dumps(values, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def shipment_key(bol, pro):
+    return f"{bol}|{pro}"
+
+
+class ExportDelta:
+    """Remembers each row of the previous export and its tracking result.
+
+    reuse() hands back the last result for rows that are unchanged and not yet due for a
+    refresh; everything else (new, changed, due) is left for the caller to track and record().
+    """
+
+    def __init__(self, path=DELTA_STATE_PATH, refresh=DELTA_REFRESH):
+        self.path = path
+        self.refresh = refresh
+        self.previous = load_state(path, 'delta state', {})
+        self.current = {}
+        self.counts = {'new': 0, 'changed': 0, 'due': 0, 'reused': 0}
+
+    def reuse(self, key, fingerprint):
+        entry = self.previous.get(key)
+        if entry is None:
+            self.counts['new'] += 1
+            return None
+        if entry['fingerprint'] != fingerprint:
+            self.counts['changed'] += 1
+            return None
+        result = entry.get('result')
+        # Errors (including carriers skipped as unavailable) are always tried again
+        if time.time() - entry['tracked_at'] >= self.refresh or not result or result['status'] == ERROR:
+            self.counts['due'] += 1
+            return None
+        self.counts['reused'] += 1
+        self.current[key] = entry
+        return TrackingResult(**result)
+
+    def record(self, key, fingerprint, result):
+        if key in self.current:
+            return  # reused: keep the original tracked_at so the refresh clock keeps running
+        self.current[key] = {
+            'fingerprint': fingerprint,
+            'tracked_at': time.time(),
+            'result': dataclasses.asdict(result),
+        }
+
+    def save(self):
+        # Only rows in this export are kept, so the state never outgrows one export
+        save_state(self.path, self.current)
+
+    def summary(self):
+        c = self.counts
+        return f"Delta: {c['new']} new, {c['changed']} changed, {c['due']} due for refresh, {c['reused']} reused"
@@ -0,0 +1,104 @@
+import os
+import time
+from tracking_result import TrackingResult, NOT_FOUND, record_timing
+from json_state import load_state, save_state
+
+# --- CONFIG ---
+# Try each carrier's extraction strategies best-first by their record, instead of in the declared order
+STRATEGY_ORDERING = os.getenv('TRACKING_STRATEGY_ORDERING', '1') == '1'
+# Hit counts and time per strategy, carried from run to run
+STRATEGY_STATS_PATH = os.getenv('TRACKING_STRATEGY_STATS', 'tracking_strategies.json')
+# Once a strategy has been tried this many times its counts are halved, so old runs weigh less
+STRATEGY_WINDOW = int(os.getenv('TRACKING_STRATEGY_WINDOW', '200'))
+# Seconds assumed for a strategy that has not been timed yet
+PRIOR_SECONDS = 0.5
+
+
+class StrategyStats:
+    """Tries, hits and seconds spent per (carrier, extraction strategy).
+
+    order() ranks a carrier's strategies by expected hits per second, smoothed so an untried
+    strategy starts out as a coin flip at PRIOR_SECONDS; ties keep the declared order.
+    """
+
+    def __init__(self, path=STRATEGY_STATS_PATH, enabled=STRATEGY_ORDERING):
+        self.path = path
+        self.enabled = enabled
+        self.stats = None  # loaded on first use
+
+    def _load(self):
+        self.stats = {}
+        saved = load_state(self.path, 'strategy stats', {})
+        for carrier, strategies in saved.items():
+            for name, counts in strategies.items():
+                self.stats[(carrier, name)] = counts
+
+    def _counts(self, carrier, name):
+        if self.stats is None:
+            self._load()
+        return self.stats.setdefault((carrier, name), [0, 0, 0.0])
+
+    def score(self, carrier, name):
+        tries, hits, seconds = self._counts(carrier, name)
+        hit_rate = (hits + 1) / (tries + 2)
+        average_seconds = (seconds + PRIOR_SECONDS) / (tries + 1)
+        return hit_rate / average_seconds
+
+    def order(self, carrier, strategies):
+        if not self.enabled:
+            return list(strategies)
+        return sorted(strategies, key=lambda strategy: -self.score(carrier, strategy.__name__))
+
+    def record(self, carrier, name, hit, seconds):
+        counts = self._counts(carrier, name)
+        counts[0] += 1
+        counts[1] += int(hit)
+        counts[2] = round(counts[2] + seconds, 3)
+        if counts[0] >= STRATEGY_WINDOW:
+            counts[:] = [counts[0] / 2, counts[1] / 2, round(counts[2] / 2, 3)]
+
+    def save(self):
+        if not self.enabled or not self.stats:
+            return
+        saved = {}
+        for (carrier, name), counts in self.stats.items():
+            saved.setdefault(carrier, {})[name] = counts
+        save_state(self.path, saved)
+
+    def summary(self):
+        if not self.stats:
+            return ''
+        by_carrier = {}
+        for (carrier, name), (tries, hits, seconds) in self.stats.items():
+            if tries:
+                by_carrier.setdefault(carrier, []).append(
+                    (self.score(carrier, name), f"{name} {hits / tries:.0%} in {seconds / tries:.2f}s"))
+        lines = [f"  {carrier}: " + " > ".join(text for _, text in sorted(ranked, key=lambda r: -r[0]))
+                 for carrier, ranked in sorted(by_carrier.items())]
+        return "Extraction strategies (best first):\n" + "\n".join(lines) if lines else ''
+
+
+# Shared by every lookup in the run; the orchestrators save it at the end
+STRATEGY_STATS = StrategyStats()
+
+
+async def extract(carrier, page, pro, strategies):
+    # Run the carrier's strategies (async fn(page, pro) -> TrackingResult or None) best-first.
+    # The first result that isn't NOT_FOUND wins; otherwise the last NOT_FOUND result is returned.
+    # A strategy that raises counts as a miss.
+    fallback = None
+    for strategy in STRATEGY_STATS.order(carrier, strategies):
+        started = time.perf_counter()
+        try:
+            result = await strategy(page, pro)
+        except Exception as e:
+            print(f"{carrier}: {strategy.__name__} failed for {pro}: {e}")
+            result = None
+        seconds = time.perf_counter() - started
+        hit = result is not None and result.status != NOT_FOUND
+        STRATEGY_STATS.record(carrier, strategy.__name__, hit, seconds)
+        record_timing(f"extract_{strategy.__name__}", seconds)
+        if hit:
+            return result
+        fallback = result or fallback
+    return fallback or TrackingResult(carrier, pro, NOT_FOUND, message="Could not find a delivery or estimated date.")
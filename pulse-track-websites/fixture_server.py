@@ -0,0 +1,200 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from urllib.parse import parse_qs, urlsplit
+
+# --- CONFIG ---
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+# Seconds added to every response, plus up to LATENCY_JITTER more at random
+LATENCY = float(os.getenv('FIXTURE_LATENCY', '0.2'))
+LATENCY_JITTER = float(os.getenv('FIXTURE_LATENCY_JITTER', '0.05'))
+# Seconds the stand-in operator takes to get past the Saia captcha (negative: never, wait for a person)
+OPERATOR_DELAY = float(os.getenv('FIXTURE_OPERATOR_DELAY', '1'))
+
+
+def _template(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return Template(f.read())
+
+
+def shipment_status(pro):
+    # Same answer for the same PRO on every carrier and every run: about one in five delivered
+    h = int(hashlib.sha1(pro.encode('utf-8')).hexdigest(), 16)
+    if h % 5 == 0:
+        return True, date.today() - timedelta(days=h % 3)
+    return False, date.today() + timedelta(days=1 + h % 7)
+
+
+def us_date(day):
+    return day.strftime('%m/%d/%Y')
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves the recorded carrier pages under /<live host>/<live path>, the layout carriers.site_url() expects."""
+
+    server_version = 'TrackingFixtures/1.0'
+
+    def log_message(self, format, *args):
+        pass  # one line per request would drown the benchmark output
+
+    def do_GET(self):
+        self._respond(parse_qs(urlsplit(self.path).query))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self._respond(parse_qs(self.rfile.read(length).decode('utf-8')))
+
+    def _respond(self, params):
+        time.sleep(self.server.latency + random.uniform(0, self.server.jitter))
+        path = urlsplit(self.path).path
+        route = ROUTES.get((self.command, path))
+        if route is None:
+            self._send(404, 'text/plain', 'no fixture for this page')
+            return
+        content_type, body = route(self, {k: v[0] for k, v in params.items()})
+        self.server.requests += 1
+        self._send(200, content_type, body)
+
+    def _send(self, status, content_type, body):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # --- carrier pages ---
+    def xpo_api(self, params):
+        pro = params.get('referenceNumber', '')
+        _, day = shipment_status(pro)
+        payload = {'data': {'shipment': {'proNbr': pro, 'estimatedDeliveryDate': day.isoformat() + 'T00:00:00'}}}
+        return 'application/json', json.dumps(payload)
+
+    def xpo_app(self, params):
+        pro = params.get('referenceNumber', '')
+        _, day = shipment_status(pro)
+        return 'text/html', _template('xpo/app.html').substitute(pro=pro, eta_short=day.strftime('%m/%d/%y'))
+
+    def forward_api(self, params):
+        pros = [p for p in params.get('numbers', '').split(',') if p]
+        shipments = [{'proNumber': p, 'estimatedDeliveryDate': shipment_status(p)[1].isoformat()} for p in pros]
+        return 'application/json', json.dumps({'shipments': shipments})
+
+    def forward_page(self, params):
+        numbers = params.get('numbers', '')
+        row = _template('forward/row.html')
+        rows = ''.join(row.substitute(pro=p, eta=us_date(shipment_status(p)[1])) for p in numbers.split(',') if p)
+        return 'text/html', _template('forward/tracking.html').substitute(rows=rows, numbers=numbers)
+
+    def sefl_form(self, params):
+        return 'text/html', _template('sefl/form.html').substitute()
+
+    def sefl_results(self, params):
+        row = _template('sefl/row.html')
+        rows = []
+        for pro in params.get('RefNum', '').split():
+            delivered, day = shipment_status(pro)
+            rows.append(row.substitute(pro=pro, label='Delivered' if delivered else 'Estimated Delivery:',
+                                       date=us_date(day)))
+        return 'text/html', _template('sefl/results.html').substitute(rows=''.join(rows))
+
+    def rl_tracing(self, params):
+        pro = params.get('pro', '')
+        delivered, day = shipment_status(pro)
+        if delivered:
+            status_line = f"Your shipment was delivered on time on {us_date(day)}"
+        else:
+            status_line = f"<span>Est. Delivery Date</span> <span>{us_date(day)}</span>"
+        return 'text/html', _template('rnl/tracing.html').substitute(pro=pro, status_line=status_line)
+
+    def saia_track(self, params):
+        delay_ms = int(self.server.operator_delay * 1000) if self.server.operator_delay >= 0 else -1
+        return 'text/html', _template('saia/track.html').substitute(operator_delay_ms=delay_ms)
+
+    def saia_results(self, params):
+        row = _template('saia/row.html')
+        rows = []
+        for pro in params.get('pros', '').split():
+            delivered, day = shipment_status(pro)
+            status_line = f"Delivered {us_date(day)}" if delivered else f"Estimated Delivery: {us_date(day)}"
+            rows.append(row.substitute(pro=pro, status_line=status_line))
+        return 'text/html', _template('saia/results.html').substitute(rows=''.join(rows))
+
+
+ROUTES = {
+    ('GET', '/ext-web.ltl-xpo.com/api/public-app/shipments'): FixtureHandler.xpo_api,
+    ('GET', '/ext-web.ltl-xpo.com/public-app/shipments'): FixtureHandler.xpo_app,
+    ('GET', '/www.forwardair.com/api/tracking'): FixtureHandler.forward_api,
+    ('GET', '/www.forwardair.com/tracking'): FixtureHandler.forward_page,
+    ('GET', '/sefl.com/Tracing/index.jsp'): FixtureHandler.sefl_form,
+    ('POST', '/sefl.com/Tracing/index.jsp'): FixtureHandler.sefl_results,
+    ('GET', '/www2.rlcarriers.com/freight/shipping/shipment-tracing'): FixtureHandler.rl_tracing,
+    ('GET', '/www.saia.com/track'): FixtureHandler.saia_track,
+    ('GET', '/www.saia.com/track/results'): FixtureHandler.saia_results,
+}
+
+
+class FixtureServer:
+    """Local stand-in for the carrier tracking sites, served from a background thread.
+
+        with FixtureServer(latency=0.3) as server:
+            os.environ['TRACKING_SITE_BASE_URL'] = server.base_url  # before importing the carrier modules
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=LATENCY, jitter=LATENCY_JITTER,
+                 operator_delay=OPERATOR_DELAY):
+        self.httpd = ThreadingHTTPServer((host, port), FixtureHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.jitter = jitter
+        self.httpd.operator_delay = operator_delay
+        self.httpd.requests = 0
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fixture-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve recorded carrier tracking pages locally.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=LATENCY, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=LATENCY_JITTER, help="up to this many more seconds at random")
+    parser.add_argument('--operator-delay', type=float, default=OPERATOR_DELAY,
+                        help="seconds before the Saia page submits itself (negative: wait for a person)")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    with FixtureServer(port=args.port, latency=args.latency, jitter=args.jitter,
+                       operator_delay=args.operator_delay) as server:
+        print(f"Serving carrier fixtures at {server.base_url}")
+        print(f"Point the scrapers at it with TRACKING_SITE_BASE_URL={server.base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
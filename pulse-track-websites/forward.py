@@ -1,45 +1,146 @@
 import asyncio
-from playwright.async_api import async_playwright
 import re
+from browser_pool import open_page
+from carriers import site_url
+from batching import find_reference
+from waits import wait_for_any, goto
+from adaptive_timeouts import timed_step
+from page_sessions import PAGE_SESSIONS, is_loaded, route_in_page
+from response_capture import CAPTURE_RESPONSES, JsonCapture, find_value, find_record, to_us_date, payload_text
+from throttle import TransientLookupError
+from tracking_result import TrackingResult, IN_TRANSIT, NOT_FOUND, tracked_lookup, tracked_batch, span
 
-async def get_forward_eta(tracking_number):
-    url = f"https://www.forwardair.com/tracking?numbers={tracking_number}"
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        page = await browser.new_page()
-        await page.goto(url)
-        await page.wait_for_timeout(4000)  # Wait for page to load
-
-        # Directly target the SVG path with the exact d attribute
-        arrow_svg_selector = 'svg > path[d="M10 6 8.59 7.41 13.17 12l-4.58 4.59L10 18l6-6z"]'
-        arrow_path = await page.query_selector(arrow_svg_selector)
-        if arrow_path:
-            parent = await arrow_path.evaluate_handle('el => el.closest("button,a")')
-            await parent.click()
-            await page.wait_for_timeout(2000)  # Wait for modal to open
-        else:
-            print("Could not find the right arrow SVG path.")
-            await browser.close()
-            return
-
-        # Extract ETA from the correct div after clicking the arrow
-        eta_div = await page.query_selector('div.header.--small.headline')
-        if eta_div:
-            eta_text = (await eta_div.text_content()).strip()
-            # Try to extract only the date (MM/DD/YYYY) from the text
-            match = re.search(r'(\d{2}/\d{2}/\d{4})', eta_text)
-            if match:
-                print(f"eta is {match.group(1)}")
-                await browser.close()
-                return
+FORWARD_URL = site_url("https://www.forwardair.com/tracking?numbers={numbers}")
+# Right-arrow icon on each shipment row that opens its details modal
+ARROW_SVG_SELECTOR = 'svg > path[d="M10 6 8.59 7.41 13.17 12l-4.58 4.59L10 18l6-6z"]'
+# Headline in the details modal that holds the ETA
+ETA_SELECTOR = 'div.header.--small.headline'
+# Keys the tracking JSON may carry the ETA under
+FORWARD_ETA_KEYS = ['estimatedDeliveryDate', 'estimatedDelivery', 'eta', 'etaDate']
+
+def is_forward_api(url):
+    return 'forwardair.com' in url and 'track' in url.lower()
+
+def extract_forward_eta(payload):
+    value = find_value(payload, FORWARD_ETA_KEYS)
+    return to_us_date(value) if value else None
+
+def payload_result(payload, tracking_number):
+    # Result for one PRO out of a (possibly multi-shipment) tracking payload, or None
+    record = find_record(payload, tracking_number)
+    eta = extract_forward_eta(record) if record else None
+    if eta:
+        return TrackingResult('FORWARD AIR', tracking_number, IN_TRANSIT, eta, f"eta is {eta}", payload_text(record))
+    return None
+
+@tracked_lookup('FORWARD AIR')
+async def get_forward_eta(tracking_number, pool=None, http=None):
+    url = FORWARD_URL.format(numbers=tracking_number)
+    async with open_page(pool, 'FORWARD AIR', keep=PAGE_SESSIONS) as page:
+        with span('navigate'):
+            reused = is_loaded(page, url)
+            if CAPTURE_RESPONSES and reused:
+                # The app is still open from the last lookup: switch it to this PRO through its router.
+                # Only a payload with this PRO's record counts; a late one for the previous PRO is ignored.
+                capture = JsonCapture(page, is_forward_api, lambda payload: payload_result(payload, tracking_number))
+                result = await route_in_page(page, 'FORWARD AIR', url, capture)
+                if result:
+                    return result
+            if CAPTURE_RESPONSES and reused:
+                # Reload the kept page; a late response for the previous PRO can still arrive, so again
+                # only a payload with this PRO's record counts
+                capture = JsonCapture(page, is_forward_api, lambda payload: payload_result(payload, tracking_number))
+                result = await capture.wait(goto(page, url))
+                if result:
+                    return result
+            elif CAPTURE_RESPONSES:
+                # Take the ETA from the tracking JSON as soon as it arrives and skip the modal
+                capture = JsonCapture(page, is_forward_api, extract_forward_eta)
+                eta = await capture.wait(goto(page, url))
+                if eta:
+                    return TrackingResult('FORWARD AIR', tracking_number, IN_TRANSIT, eta, f"eta is {eta}",
+                                          payload_text(capture.payload))
+            else:
+                await goto(page, url)
+            # No payload seen: fall back to clicking through the rendered page
+            await wait_for_any(page, [ARROW_SVG_SELECTOR], 'page')  # Wait for the shipment row to render
+
+        with span('interact'):
+            # Directly target the SVG path with the exact d attribute
+            arrow_path = await page.query_selector(ARROW_SVG_SELECTOR)
+            if arrow_path:
+                parent = await arrow_path.evaluate_handle('el => el.closest("button,a")')
+                await parent.click()
+                await wait_for_any(page, [ETA_SELECTOR], 'modal')  # Wait for modal to open
+            else:
+                raise TransientLookupError("Could not find the right arrow SVG path.")
+
+        with span('extract'):
+            return await read_eta_modal(page, tracking_number)
+
+@tracked_batch('FORWARD AIR')
+async def get_forward_etas(tracking_numbers, pool=None, http=None):
+    # The tracking URL takes a comma-separated list; each shipment row has its own arrow/modal
+    url = FORWARD_URL.format(numbers=','.join(tracking_numbers))
+    results = {}
+    async with open_page(pool, 'FORWARD AIR') as page:
+        with span('navigate'):
+            if CAPTURE_RESPONSES:
+                capture = JsonCapture(page, is_forward_api,
+                                      lambda payload: any(payload_result(payload, p) for p in tracking_numbers))
+                if await capture.wait(goto(page, url)):
+                    for pro in tracking_numbers:
+                        result = payload_result(capture.payload, pro)
+                        if result:
+                            results[pro] = result
+                    if len(results) == len(tracking_numbers):
+                        return results
             else:
-                print(f"Found ETA div but could not extract date: {eta_text}")
-                await browser.close()
-                return
+                await goto(page, url)
+            # Click through the rendered rows for any PRO the payload did not cover
+            await wait_for_any(page, [ARROW_SVG_SELECTOR], 'page')  # Wait for the shipment rows to render
+
+        arrows = await page.query_selector_all(ARROW_SVG_SELECTOR)
+        if not arrows and not results:
+            raise TransientLookupError("Could not find the right arrow SVG path.")
+        for arrow_path in arrows:
+            parent = await arrow_path.evaluate_handle('el => el.closest("button,a")')
+            # Match the row to a PRO by the text of the row the arrow sits in
+            row_text = await parent.evaluate(
+                'el => (el.closest("tr, li, [role=row]") || el.parentElement.parentElement).innerText')
+            pro = next((p for p in tracking_numbers if find_reference(row_text, p) >= 0 and p not in results), None)
+            if pro is None:
+                continue
+            with span('interact'):
+                await parent.click()
+                await wait_for_any(page, [ETA_SELECTOR], 'modal')  # Wait for modal to open
+            with span('extract'):
+                results[pro] = await read_eta_modal(page, pro)
+            with span('interact'):
+                await page.keyboard.press('Escape')  # Close the modal before opening the next row
+                try:
+                    with timed_step('wait_modal_closed', 5000) as timeout:
+                        await page.locator(ETA_SELECTOR).first.wait_for(state='detached', timeout=timeout)
+                except Exception:
+                    pass
+    return results
+
+async def read_eta_modal(page, tracking_number):
+    # Extract ETA from the correct div after clicking the arrow
+    eta_div = await page.query_selector(ETA_SELECTOR)
+    if eta_div:
+        eta_text = (await eta_div.text_content()).strip()
+        # Try to extract only the date (MM/DD/YYYY) from the text
+        match = re.search(r'(\d{2}/\d{2}/\d{4})', eta_text)
+        if match:
+            return TrackingResult('FORWARD AIR', tracking_number, IN_TRANSIT, match.group(1),
+                                  f"eta is {match.group(1)}", eta_text)
         else:
-            print("Could not find ETA div after clicking arrow.")
-            await browser.close()
-            return
+            return TrackingResult('FORWARD AIR', tracking_number, NOT_FOUND,
+                                  message=f"Found ETA div but could not extract date: {eta_text}", raw_text=eta_text)
+    else:
+        return TrackingResult('FORWARD AIR', tracking_number, NOT_FOUND,
+                              message="Could not find ETA div after clicking arrow.")
 
 if __name__ == "__main__":
-    asyncio.run(get_forward_eta("93588227")) 
\ No newline at end of file
+    print(asyncio.run(get_forward_eta("93588227")))
@@ -0,0 +1,189 @@
+import os
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+try:
+    import aiohttp
+except ImportError:  # optional: without it every carrier uses the browser path
+    aiohttp = None
+
+# --- CONFIG ---
+# Open keep-alive connections shared by all HTTP lookups in a run
+HTTP_POOL_SIZE = int(os.getenv('TRACKING_HTTP_POOL_SIZE', '20'))
+# Total seconds allowed for one HTTP request
+HTTP_TIMEOUT = float(os.getenv('TRACKING_HTTP_TIMEOUT', '20'))
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/124.0 Safari/537.36')
+
+
+class HttpClient:
+    """One pooled aiohttp session for a whole run, shared by the browserless carrier lookups.
+
+        async with HttpClient() as http:
+            await get_xpo_eta(pro, http=http)
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = None
+
+    async def __aenter__(self):
+        if aiohttp is None:
+            return self  # requests raise, so callers fall back to the browser
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'User-Agent': USER_AGENT},
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _session(self):
+        if self.session is None:
+            raise RuntimeError("aiohttp is not installed" if aiohttp is None else "HttpClient is not open")
+        return self.session
+
+    async def get_json(self, url, **kwargs):
+        async with self._session().get(url, headers={'Accept': 'application/json'}, **kwargs) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def get_text(self, url, **kwargs):
+        async with self._session().get(url, **kwargs) as response:
+            response.raise_for_status()
+            return await response.text()
+
+    async def post_form(self, url, data, **kwargs):
+        async with self._session().post(url, data=data, **kwargs) as response:
+            response.raise_for_status()
+            return await response.text()
+
+
+async def with_client(http, request):
+    # Run request(client) on the shared client, or on a one-off client when called standalone
+    if http is not None:
+        return await request(http)
+    async with HttpClient() as client:
+        return await request(client)
+
+
+# --- HTML helpers for server-rendered tracking pages ---
+_BLOCK_TAGS = {'br', 'p', 'div', 'tr', 'li', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section', 'form'}
+_CELL_TAGS = {'td', 'th'}
+
+
+class _TextParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style', 'noscript'):
+            self._skip += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append('\n')
+        elif tag in _CELL_TAGS:
+            self.parts.append('\t')
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style', 'noscript'):
+            self._skip = max(0, self._skip - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def html_text(html):
+    # Roughly what inner_text('body') gives for a static page: one line per block, cells tab-separated
+    parser = _TextParser()
+    parser.feed(html)
+    text = ''.join(parser.parts)
+    lines = (re.sub(r'[ \t\r\f\v]+', ' ', line).strip() for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+class Form:
+    def __init__(self, action, method):
+        self.action = action
+        self.method = method
+        self.fields = {}  # name -> value for inputs that get submitted as-is
+        self.textareas = []
+        self.submits = []  # (name, value, label) for named submit buttons
+
+
+class _FormParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.forms = []
+        self._form = None
+        self._button = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'form':
+            self._form = Form(attrs.get('action', ''), attrs.get('method', 'get').lower())
+            self.forms.append(self._form)
+        elif self._form is None:
+            return
+        elif tag == 'input':
+            kind = attrs.get('type', 'text').lower()
+            name = attrs.get('name')
+            if not name:
+                return
+            if kind in ('submit', 'image'):
+                self._form.submits.append((name, attrs.get('value', ''), attrs.get('value', '')))
+            elif kind in ('checkbox', 'radio'):
+                if 'checked' in attrs:
+                    self._form.fields[name] = attrs.get('value', 'on')
+            elif kind not in ('button', 'reset', 'file'):
+                self._form.fields[name] = attrs.get('value', '')
+        elif tag == 'textarea' and attrs.get('name'):
+            self._form.textareas.append(attrs['name'])
+        elif tag == 'button' and attrs.get('type', 'submit').lower() == 'submit' and attrs.get('name'):
+            self._button = [attrs['name'], attrs.get('value', ''), '']
+
+    def handle_data(self, data):
+        if self._button is not None:
+            self._button[2] += data
+
+    def handle_endtag(self, tag):
+        if tag == 'form':
+            self._form = None
+        elif tag == 'button' and self._button is not None:
+            name, value, label = self._button
+            if self._form is not None:
+                self._form.submits.append((name, value, label.strip()))
+            self._button = None
+
+
+def parse_form(html, base_url, with_textarea=True):
+    # First form on the page (the first one with a <textarea> by default), with its action made absolute
+    parser = _FormParser()
+    parser.feed(html)
+    for form in parser.forms:
+        if form.textareas or not with_textarea:
+            form.action = urljoin(base_url, form.action or base_url)
+            return form
+    return None
+
+
+def form_data(form, textarea_value, submit_label=None):
+    # Fields to post: the form's own inputs, the first textarea filled in, and the named submit button
+    data = dict(form.fields)
+    data[form.textareas[0]] = textarea_value
+    for name, value, label in form.submits:
+        if submit_label is None or submit_label.lower() in (label or value).lower():
+            data[name] = value
+            break
+    return data
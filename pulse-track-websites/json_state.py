@@ -0,0 +1,23 @@
+import json
+import os
+
+
+def load_state(path, what, default):
+    # State saved by an earlier run, or `default` when there is none yet or it can't be read
+    # (`what` names it in the warning, e.g. 'latency history')
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable {what} {path}: {e}")
+        return default
+
+
+def save_state(path, state):
+    # Written to a temp file and renamed, so a run that dies mid-write leaves the previous state intact
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,92 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+# --- CONFIG ---
+# Record a Playwright trace and a HAR for every browser lookup, keeping them only for slow or failed ones
+PROFILE_ENABLED = os.getenv('TRACKING_PROFILE', '0') == '1'
+PROFILE_DIR = os.getenv('TRACKING_PROFILE_DIR', 'tracking_profiles')
+# A lookup at least this many seconds long keeps its capture even when it found the date
+PROFILE_SLOW_SECONDS = float(os.getenv('TRACKING_PROFILE_SLOW_SECONDS', '20'))
+# Oldest captures are deleted once the directory grows past this
+PROFILE_MAX_MB = float(os.getenv('TRACKING_PROFILE_MAX_MB', '500'))
+# 'omit' keeps the HAR to headers and timings; 'embed' also stores the response bodies
+PROFILE_HAR_CONTENT = os.getenv('TRACKING_PROFILE_HAR_CONTENT', 'omit')
+
+TRACE_FILE = 'trace.zip'
+HAR_FILE = 'network.har'
+
+
+async def open_recorded_context(browser, options):
+    # Fresh context with HAR recording and tracing on, so the capture covers a single lookup.
+    # Returns (context, capture_dir); the files land in capture_dir when the context is closed.
+    capture_dir = tempfile.mkdtemp(prefix='tracking-profile-')
+    context = await browser.new_context(record_har_path=os.path.join(capture_dir, HAR_FILE),
+                                        record_har_content=PROFILE_HAR_CONTENT, **options)
+    await context.tracing.start(screenshots=True, snapshots=True)
+    return context, capture_dir
+
+
+async def close_recorded_context(context, capture_dir):
+    try:
+        await context.tracing.stop(path=os.path.join(capture_dir, TRACE_FILE))
+    except Exception:
+        pass  # browser gone: whatever was written is still worth a look
+    try:
+        await context.close()  # writes the HAR
+    except Exception:
+        pass
+
+
+def discard_captures(capture_dirs):
+    for capture_dir in capture_dirs:
+        shutil.rmtree(capture_dir, ignore_errors=True)
+
+
+def keep_captures(capture_dirs, carrier, results, seconds, reason, profile_dir=PROFILE_DIR, max_mb=PROFILE_MAX_MB):
+    # Move a lookup's captures (one per attempt) into profile_dir, then trim the directory to max_mb
+    pros = list(results)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}_{_slug(carrier)}_{_slug(pros[0]) if pros else 'none'}"
+    if len(pros) > 1:
+        name += f"+{len(pros) - 1}"
+    target = os.path.join(profile_dir, f"{name}_{reason}")
+    n = 1
+    while os.path.exists(target):
+        n += 1
+        target = os.path.join(profile_dir, f"{name}_{reason}-{n}")
+    os.makedirs(profile_dir, exist_ok=True)
+    if len(capture_dirs) == 1:
+        shutil.move(capture_dirs[0], target)
+    else:
+        for n, capture_dir in enumerate(capture_dirs, 1):
+            shutil.move(capture_dir, os.path.join(target, f"attempt-{n}"))
+    with open(os.path.join(target, 'lookup.json'), 'w', encoding='utf-8') as f:
+        json.dump({'carrier': carrier, 'seconds': seconds, 'reason': reason,
+                   'results': {pro: {'status': r.status, 'message': r.message, 'timings': r.timings}
+                               for pro, r in results.items()}}, f, indent=2)
+    rotate(profile_dir, max_mb)
+    return target
+
+
+def rotate(profile_dir, max_mb=PROFILE_MAX_MB):
+    # Capture directories are named by time, so sorting by name deletes the oldest first
+    sizes = {name: _size(os.path.join(profile_dir, name)) for name in sorted(os.listdir(profile_dir))}
+    total = sum(sizes.values())
+    for name, size in sizes.items():
+        if total <= max_mb * 1_000_000:
+            break
+        shutil.rmtree(os.path.join(profile_dir, name), ignore_errors=True)
+        total -= size
+
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9]+', '-', text).strip('-') or 'x'
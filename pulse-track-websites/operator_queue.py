@@ -0,0 +1,70 @@
+import asyncio
+import os
+import sys
+import threading
+from waits import wait_for_any
+
+# --- CONFIG ---
+# Seconds to wait for someone to solve a captcha before the lookup gives up
+OPERATOR_TIMEOUT = float(os.getenv('TRACKING_OPERATOR_TIMEOUT', '600'))
+
+
+class OperatorQueue:
+    """Steps that need a person (solving the Saia captcha), handled one at a time without blocking the event loop.
+
+    A task waits until its page shows the results (the operator solved the captcha and clicked
+    TRACK) or the operator presses Enter in the console, whichever comes first. Lookups for other
+    carriers keep running in the meantime.
+    """
+
+    def __init__(self, timeout=OPERATOR_TIMEOUT):
+        self.timeout = timeout
+        self.waiting = 0
+        self.solved = 0
+        self._turn = None
+        self._lines = None
+
+    def _start_console(self):
+        # stdin is read on a daemon thread, so a pending read never blocks the loop or the exit
+        loop = asyncio.get_running_loop()
+        self._lines = asyncio.Queue()
+
+        def read():
+            for line in sys.stdin:
+                loop.call_soon_threadsafe(self._lines.put_nowait, line)
+
+        threading.Thread(target=read, name='operator-console', daemon=True).start()
+
+    async def wait_for(self, page, prompt, done_selectors):
+        # Returns True once the page shows one of done_selectors or Enter is pressed, False on timeout
+        if self._turn is None:
+            self._turn = asyncio.Lock()
+            self._start_console()
+        self.waiting += 1
+        if self._turn.locked():
+            print(f"Queued for the operator ({self.waiting} waiting): {prompt}")
+        async with self._turn:
+            self.waiting -= 1
+            while not self._lines.empty():
+                self._lines.get_nowait()  # Enter presses meant for an earlier task
+            try:
+                await page.bring_to_front()
+            except Exception:
+                pass
+            print(f"\a>>> ACTION NEEDED: {prompt}")
+            print(">>> Results are picked up automatically once they show, or press Enter when done.")
+            # A person's solve time is no guide to how long the next one needs: the timeout stays as configured
+            rendered = asyncio.ensure_future(wait_for_any(page, done_selectors, 'operator', self.timeout * 1000,
+                                                          adaptive=False))
+            entered = asyncio.ensure_future(self._lines.get())
+            done, pending = await asyncio.wait({rendered, entered}, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()  # a cancelled wait_for_any still records wait_operator
+            solved = entered in done or rendered.result()
+            if solved:
+                self.solved += 1
+            return solved
+
+
+# Shared by every lookup in the run, so prompts never overlap
+OPERATOR = OperatorQueue()
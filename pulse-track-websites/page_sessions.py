@@ -0,0 +1,60 @@
+import os
+from urllib.parse import urlsplit
+
+# --- CONFIG ---
+# Keep each carrier's tracking page open between lookups and send the next PRO through it
+# (the page's own form, or the app's router) instead of loading the page again
+PAGE_SESSIONS = os.getenv('TRACKING_PAGE_SESSIONS', '1') == '1'
+# Seconds to wait for a single-page app to fetch the new shipment after a route change, before reloading instead
+ROUTE_PAYLOAD_TIMEOUT = float(os.getenv('TRACKING_ROUTE_PAYLOAD_TIMEOUT', '3'))
+# Route changes in a row that fetched nothing before a carrier's app is treated as ignoring them
+ROUTE_MAX_MISSES = 3
+
+# Same-document navigation the way the app's own links do it: history entry plus popstate for the router
+ROUTE_JS = """url => {
+    history.pushState(null, '', url);
+    window.dispatchEvent(new PopStateEvent('popstate', {state: null}));
+}"""
+
+
+def is_loaded(page, url):
+    # True when the page already shows the app or form at url (same scheme, host and path)
+    return urlsplit(page.url)[:3] == urlsplit(url)[:3]
+
+
+class RouteRecord:
+    """Whether each carrier's app answers a route change with a fresh backend call.
+
+    A carrier whose app never has after ROUTE_MAX_MISSES tries is reloaded from then on,
+    so an app that ignores the history API costs a few short waits per run, not one per PRO.
+    """
+
+    def __init__(self):
+        self.worked = set()
+        self.misses = {}
+
+    def should_try(self, carrier):
+        return carrier in self.worked or self.misses.get(carrier, 0) < ROUTE_MAX_MISSES
+
+    def record(self, carrier, hit):
+        if hit:
+            self.worked.add(carrier)
+            self.misses[carrier] = 0
+        else:
+            self.misses[carrier] = self.misses.get(carrier, 0) + 1
+
+
+ROUTES = RouteRecord()
+
+
+async def route_in_page(page, carrier, url, capture):
+    # Point an already loaded single-page app at url through its router, without a reload.
+    # Returns what capture (a response_capture.JsonCapture) extracted from the backend call
+    # the app makes for it, or None when there was none and the caller should load the page.
+    # The page still has the previous PRO's app state, so capture should only accept this PRO's record.
+    if not ROUTES.should_try(carrier):
+        capture.close()
+        return None
+    value = await capture.wait(page.evaluate(ROUTE_JS, url), timeout=ROUTE_PAYLOAD_TIMEOUT)
+    ROUTES.record(carrier, value is not None)
+    return value
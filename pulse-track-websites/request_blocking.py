@@ -0,0 +1,75 @@
+import os
+from urllib.parse import urlparse
+
+# --- CONFIG ---
+BLOCK_REQUESTS = os.getenv('TRACKING_BLOCK_REQUESTS', '1') == '1'
+# Resource types none of the scrapers read
+BLOCKED_TYPES = {'image', 'font', 'media'}
+# Analytics, ad and chat-widget hosts (matched as substrings of the request host)
+BLOCKED_HOSTS = [
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googleadservices.com',
+    'facebook.net', 'connect.facebook', 'linkedin.com', 'bing.com', 'clarity.ms', 'hotjar',
+    'newrelic.com', 'nr-data.net', 'segment.io', 'optimizely', 'hubspot', 'hs-scripts', 'hs-analytics',
+    'intercom', 'drift.com', 'livechatinc', 'zendesk', 'zopim', 'qualtrics', 'onetrust', 'cookielaw',
+]
+# Per-carrier overrides: extra types/hosts to block, and URLs (substrings) that must always load
+CARRIER_RULES = {
+    # The captcha is an image challenge; everything from the captcha provider has to load
+    'SAIA': {'allow_urls': ['recaptcha', 'gstatic.com', 'hcaptcha', 'captcha']},
+    'SEFL': {'block_types': {'stylesheet'}},  # plain server-rendered tables, read without CSS
+    'R&L': {},
+    'XPO': {},
+    'FORWARD AIR': {},
+}
+# Rough transfer size of a blocked request, used to estimate bytes saved (aborted requests have no size)
+AVERAGE_BYTES = {'image': 40_000, 'font': 35_000, 'media': 250_000, 'stylesheet': 25_000, 'script': 60_000}
+DEFAULT_AVERAGE_BYTES = 10_000
+
+
+class BlockStats:
+    def __init__(self):
+        self.blocked = {}  # resource type -> count
+        self.allowed = 0
+
+    def add(self, resource_type):
+        self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+
+    def estimated_bytes(self):
+        return sum(AVERAGE_BYTES.get(t, DEFAULT_AVERAGE_BYTES) * n for t, n in self.blocked.items())
+
+    def summary(self):
+        total = sum(self.blocked.values())
+        by_type = ", ".join(f"{t} {n}" for t, n in sorted(self.blocked.items())) or "none"
+        return (f"Blocked {total} of {total + self.allowed} requests ({by_type}), "
+                f"about {self.estimated_bytes() / 1_000_000:.1f} MB saved")
+
+
+# Totals for the whole run, printed by the orchestrators at the end
+RUN_STATS = BlockStats()
+
+
+def should_block(carrier, resource_type, url):
+    rules = CARRIER_RULES.get(carrier, {})
+    host = urlparse(url).hostname or ''
+    if any(allowed in url for allowed in rules.get('allow_urls', [])):
+        return False
+    if resource_type in BLOCKED_TYPES or resource_type in rules.get('block_types', set()):
+        return True
+    return any(blocked in host for blocked in BLOCKED_HOSTS + rules.get('block_hosts', []))
+
+
+async def install_blocking(page, carrier, stats=RUN_STATS):
+    # Abort requests the scrapers never read before they leave the browser
+    if not BLOCK_REQUESTS:
+        return
+
+    async def handle(route):
+        request = route.request
+        if should_block(carrier, request.resource_type, request.url):
+            stats.add(request.resource_type)
+            await route.abort()
+        else:
+            stats.allowed += 1
+            await route.continue_()
+
+    await page.route('**/*', handle)
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import re
+import time
+from datetime import datetime, timezone
+from tracking_result import record_timing, current_carrier
+
+# --- CONFIG ---
+# Read shipment data from the carrier's backend JSON responses before scraping the DOM
+CAPTURE_RESPONSES = os.getenv('TRACKING_CAPTURE_RESPONSES', '1') == '1'
+# Seconds to keep listening for the payload after the page has loaded
+PAYLOAD_TIMEOUT = float(os.getenv('TRACKING_PAYLOAD_TIMEOUT', '10'))
+# Seconds to keep listening instead, once a carrier's payload has not matched for PAYLOAD_MAX_MISSES lookups in a row
+PAYLOAD_GRACE = float(os.getenv('TRACKING_PAYLOAD_GRACE', '1'))
+PAYLOAD_MAX_MISSES = 3
+
+
+class PayloadRecord:
+    """Whether each carrier's backend JSON has been matching, and so how long a capture should wait for it.
+
+    The payload keys are a guess at each carrier's schema. A carrier whose payload never matched in
+    PAYLOAD_MAX_MISSES lookups in a row only gets PAYLOAD_GRACE after the page load, so a wrong guess
+    costs a few full waits per run, not one per lookup; a later match puts it back on PAYLOAD_TIMEOUT.
+    """
+
+    def __init__(self):
+        self.worked = set()
+        self.misses = {}
+
+    def timeout(self, carrier):
+        if carrier in self.worked or self.misses.get(carrier, 0) < PAYLOAD_MAX_MISSES:
+            return PAYLOAD_TIMEOUT
+        return PAYLOAD_GRACE
+
+    def record(self, carrier, hit):
+        if hit:
+            self.worked.add(carrier)
+            self.misses[carrier] = 0
+        else:
+            self.worked.discard(carrier)
+            self.misses[carrier] = self.misses.get(carrier, 0) + 1
+
+
+PAYLOADS = PayloadRecord()
+
+
+class JsonCapture:
+    """Listens on page.on('response') and keeps the first JSON payload that has what we need.
+
+    url_match(url) picks the backend calls to look at; extract(payload) returns the value
+    we want from a payload, or None to keep listening.
+    """
+
+    def __init__(self, page, url_match, extract):
+        self.page = page
+        self.url_match = url_match
+        self.extract = extract
+        self.payload = None
+        self.future = asyncio.get_running_loop().create_future()
+        page.on('response', self._on_response)
+
+    async def _on_response(self, response):
+        if self.future.done() or not self.url_match(response.url):
+            return
+        if 'json' not in response.headers.get('content-type', ''):
+            return
+        try:
+            payload = await response.json()
+        except Exception:
+            return
+        value = self.extract(payload)
+        if value and not self.future.done():
+            self.payload = payload
+            self.future.set_result(value)
+
+    def close(self):
+        self.page.remove_listener('response', self._on_response)
+
+    async def wait(self, navigation, timeout=None):
+        # Race the page navigation against the payload. Returns the extracted value, or None
+        # if the page loaded and no payload turned up within `timeout` seconds after it.
+        # Without a timeout, the wait follows the lookup's carrier record (see PayloadRecord).
+        carrier = current_carrier() if timeout is None else None
+        if timeout is None:
+            timeout = PAYLOADS.timeout(carrier)
+        started = time.perf_counter()
+        navigation = asyncio.ensure_future(navigation)
+        try:
+            await asyncio.wait({navigation, self.future}, return_when=asyncio.FIRST_COMPLETED)
+            if self.future.done():
+                navigation.cancel()
+                value = self.future.result()
+            else:
+                navigation.result()  # re-raise navigation errors
+                try:
+                    value = await asyncio.wait_for(asyncio.shield(self.future), timeout)
+                except asyncio.TimeoutError:
+                    value = None
+            if carrier is not None:
+                PAYLOADS.record(carrier, value is not None)
+            return value
+        finally:
+            self.close()
+            record_timing('wait_payload', time.perf_counter() - started)
+
+
+def _normalize_key(key):
+    return re.sub(r'[^a-z0-9]', '', str(key).lower())
+
+
+def find_value(payload, keys):
+    # Depth-first search for the first non-empty value stored under any of `keys`
+    # (compared case- and punctuation-insensitively, so estimatedDeliveryDate == estimated_delivery_date)
+    wanted = {_normalize_key(k) for k in keys}
+    stack = [payload]
+    while stack:
+        node = stack.pop(0)
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if _normalize_key(key) in wanted and value not in (None, '', [], {}):
+                    return value
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+
+def find_record(payload, reference):
+    # Find the first object that has `reference` as one of its own values (e.g. one shipment in a list)
+    stack = [payload]
+    while stack:
+        node = stack.pop(0)
+        if isinstance(node, dict):
+            if any(not isinstance(v, (dict, list)) and str(v).strip() == reference for v in node.values()):
+                return node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+
+def to_us_date(value):
+    # Normalize ISO dates, epoch milliseconds and MM/DD/YY(YY) strings to MM/DD/YYYY
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).strftime('%m/%d/%Y')
+    text = str(value).strip()
+    match = re.match(r'(\d{4})-(\d{2})-(\d{2})', text)
+    if match:
+        return f"{match.group(2)}/{match.group(3)}/{match.group(1)}"
+    match = re.search(r'(\d{1,2})/(\d{1,2})/(\d{2,4})', text)
+    if match:
+        mm, dd, year = match.groups()
+        if len(year) == 2:
+            year = str(2000 + int(year) if int(year) < 50 else 1900 + int(year))
+        return f"{int(mm):02d}/{int(dd):02d}/{year}"
+    return None
+
+
+def payload_text(payload):
+    return json.dumps(payload, default=str)
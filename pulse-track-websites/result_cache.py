@@ -0,0 +1,78 @@
+import json
+import os
+import sqlite3
+import time
+from tracking_result import TrackingResult, DELIVERED, IN_TRANSIT, NOT_FOUND, ERROR
+
+# --- CONFIG ---
+CACHE_ENABLED = os.getenv('TRACKING_CACHE', '1') == '1'
+CACHE_PATH = os.getenv('TRACKING_CACHE_PATH', 'tracking_cache.sqlite3')
+# Seconds a result stays fresh, by status. None keeps it forever (delivered never changes).
+STATUS_TTL = {
+    DELIVERED: None,
+    IN_TRANSIT: float(os.getenv('TRACKING_CACHE_IN_TRANSIT_TTL', str(4 * 3600))),
+    NOT_FOUND: float(os.getenv('TRACKING_CACHE_NOT_FOUND_TTL', str(30 * 60))),
+    ERROR: float(os.getenv('TRACKING_CACHE_ERROR_TTL', str(5 * 60))),
+}
+
+
+class ResultCache:
+    """On-disk cache of TrackingResults keyed by (carrier, PRO).
+
+    Pass it to the get_*_eta functions (cache=cache); a fresh hit is returned without
+    opening a page, and every new result is stored with the TTL for its status.
+    """
+
+    def __init__(self, path=CACHE_PATH, enabled=CACHE_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+
+    def __enter__(self):
+        if self.enabled:
+            self._db = sqlite3.connect(self.path)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                ' carrier TEXT NOT NULL, pro TEXT NOT NULL, status TEXT, date TEXT, message TEXT,'
+                ' raw_text TEXT, error TEXT, timings TEXT, fetched_at REAL, expires_at REAL,'
+                ' PRIMARY KEY (carrier, pro))')
+            self._db.commit()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def get(self, carrier, pro):
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            'SELECT status, date, message, raw_text, error, timings, expires_at'
+            ' FROM results WHERE carrier = ? AND pro = ?', (carrier, pro)).fetchone()
+        if row is None or (row[6] is not None and row[6] < time.time()):
+            self.misses += 1
+            return None
+        self.hits += 1
+        status, date, message, raw_text, error, timings, _ = row
+        return TrackingResult(carrier, pro, status, date, message, raw_text,
+                              json.loads(timings or '{}'), error, cached=True)
+
+    def put(self, result):
+        if self._db is None or result.cached:
+            return
+        now = time.time()
+        ttl = STATUS_TTL.get(result.status, STATUS_TTL[ERROR])
+        self._db.execute(
+            'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (result.carrier, result.pro, result.status, result.date, result.message, result.raw_text,
+             result.error, json.dumps(result.timings), now, None if ttl is None else now + ttl))
+        self._db.commit()
+
+    def summary(self):
+        return f"Cache: {self.hits} hit(s), {self.misses} miss(es)"
@@ -1,42 +1,97 @@
 import asyncio
-from playwright.async_api import async_playwright
+import os
 import re
+import time
+from urllib.parse import quote
+from browser_pool import open_page
+from carriers import site_url
+from http_client import with_client, html_text
+from waits import wait_for_any, goto
+from extraction import extract
+from tracking_result import TrackingResult, DELIVERED, IN_TRANSIT, NOT_FOUND, tracked_lookup, record_timing, span
 
-async def get_rl_eta(pro_number):
-    url = f"https://www2.rlcarriers.com/freight/shipping/shipment-tracing?pro={pro_number}&docType=PRO&source=web"
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        page = await browser.new_page()
-        await page.goto(url)
-        await page.wait_for_timeout(4000)  # Wait for page to load
-
-        # Try to extract the delivery status line
-        delivered_locator = page.locator("text=delivered on time on")
-        if await delivered_locator.count() > 0:
-            delivered_text = await delivered_locator.first.text_content()
-            # Extract the date from the status line
-            match = re.search(r"delivered on time on (\d{2}/\d{2}/\d{4})", delivered_text, re.IGNORECASE)
-            if match:
-                print(f"delivered on {match.group(1)}")
-            else:
-                print(delivered_text.strip())
-        else:
-            # Try to find "Est. Delivery Date" if not delivered
-            eta_locator = page.locator("text=Est. Delivery Date")
-            if await eta_locator.count() > 0:
-                eta_row = eta_locator.first
-                parent = await eta_row.evaluate_handle("el => el.parentElement")
-                parent_text = await parent.evaluate("el => el.textContent")
-                # Extract only the date (MM/DD/YYYY) from the parent text
-                match = re.search(r"(\d{1,2}/\d{1,2}/\d{4})", parent_text)
-                if match:
-                    print(f"ETA {match.group(1)}")
-                else:
-                    print("Could not find ETA date.")
-            else:
-                print("Could not find delivery status or ETA.")
-
-        await browser.close()
+# --- CONFIG ---
+RL_URL = site_url("https://www2.rlcarriers.com/freight/shipping/shipment-tracing?pro={pro}&docType=PRO&source=web")
+# 'http' fetches the server-rendered tracing page and parses its HTML; 'browser' drives Chromium
+RL_TRANSPORT = os.getenv('RL_TRANSPORT', 'http')
+
+async def fetch_rl_text(pro_number, http=None):
+    # Browserless lookup of the tracing page text; None if the request fails
+    started = time.perf_counter()
+    try:
+        html = await with_client(http, lambda client: client.get_text(RL_URL.format(pro=quote(pro_number))))
+        return html_text(html)
+    except Exception as e:
+        print(f"R&L HTTP lookup failed for {pro_number}, using the browser: {e}")
+        return None
+    finally:
+        record_timing('http', time.perf_counter() - started)
+
+def parse_rl_text(pro_number, full_text):
+    # Same reading as the browser path, applied to the page text
+    delivered_match = re.search(r"delivered on time on (\d{2}/\d{2}/\d{4})", full_text, re.IGNORECASE)
+    if delivered_match:
+        return TrackingResult('R&L', pro_number, DELIVERED, delivered_match.group(1),
+                              f"delivered on {delivered_match.group(1)}", full_text)
+    eta_match = re.search(r"Est\. Delivery Date\W*(\d{1,2}/\d{1,2}/\d{4})", full_text)
+    if eta_match:
+        return TrackingResult('R&L', pro_number, IN_TRANSIT, eta_match.group(1),
+                              f"ETA {eta_match.group(1)}", full_text)
+    return TrackingResult('R&L', pro_number, NOT_FOUND,
+                          message="Could not find delivery status or ETA.", raw_text=full_text)
+
+async def rl_delivered_line(page, pro_number):
+    # The delivery status line, with the date taken out of it
+    delivered_locator = page.locator("text=delivered on time on")
+    if await delivered_locator.count() == 0:
+        return None
+    delivered_text = await delivered_locator.first.text_content()
+    match = re.search(r"delivered on time on (\d{2}/\d{2}/\d{4})", delivered_text, re.IGNORECASE)
+    if match:
+        return TrackingResult('R&L', pro_number, DELIVERED, match.group(1),
+                              f"delivered on {match.group(1)}", delivered_text)
+    return TrackingResult('R&L', pro_number, DELIVERED, message=delivered_text.strip(), raw_text=delivered_text)
+
+async def rl_eta_row(page, pro_number):
+    # The "Est. Delivery Date" label and the date (MM/DD/YYYY) in the element around it.
+    # A delivered shipment is left to the other strategies, whatever order they run in.
+    eta_locator = page.locator("text=Est. Delivery Date")
+    if await eta_locator.count() == 0 or await page.locator("text=delivered on time on").count() > 0:
+        return None
+    parent = await eta_locator.first.evaluate_handle("el => el.parentElement")
+    parent_text = await parent.evaluate("el => el.textContent")
+    match = re.search(r"(\d{1,2}/\d{1,2}/\d{4})", parent_text)
+    if match:
+        return TrackingResult('R&L', pro_number, IN_TRANSIT, match.group(1), f"ETA {match.group(1)}", parent_text)
+    return TrackingResult('R&L', pro_number, NOT_FOUND, message="Could not find ETA date.", raw_text=parent_text)
+
+async def rl_page_text(page, pro_number):
+    return parse_rl_text(pro_number, await page.inner_text('body'))
+
+# Ways to read the tracing page, in the order they were first written; extract() reorders them by their record
+RL_EXTRACTORS = [rl_delivered_line, rl_eta_row, rl_page_text]
+
+@tracked_lookup('R&L')
+async def get_rl_eta(pro_number, pool=None, http=None):
+    if RL_TRANSPORT == 'http':
+        with span('navigate'):
+            full_text = await fetch_rl_text(pro_number, http)
+        if full_text is not None:
+            with span('extract'):
+                result = parse_rl_text(pro_number, full_text)
+            if result.status != NOT_FOUND:
+                return result
+            # A 200 without the status (bot check, new layout, page filled in by script): ask the rendered page
+            print(f"R&L: no status in the tracing HTML for {pro_number}, checking the rendered page")
+    url = RL_URL.format(pro=pro_number)
+    async with open_page(pool, 'R&L') as page:
+        with span('navigate'):
+            await goto(page, url)
+            # Wait for either the delivered status line or the ETA row to render
+            await wait_for_any(page, ["text=delivered on time on", "text=Est. Delivery Date"], 'results')
+
+        with span('extract'):
+            return await extract('R&L', page, pro_number, RL_EXTRACTORS)
 
 if __name__ == "__main__":
-    asyncio.run(get_rl_eta("I625453227"))
\ No newline at end of file
+    print(asyncio.run(get_rl_eta("I625453227")))
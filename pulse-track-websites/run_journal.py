@@ -0,0 +1,73 @@
+import dataclasses
+import json
+import os
+import time
+from tracking_result import TrackingResult, ERROR
+
+# --- CONFIG ---
+# Append-only log of the shipments finished in the current run, kept until the run completes
+JOURNAL_PATH = os.getenv('TRACKING_JOURNAL', 'tracking_run_journal.jsonl')
+
+
+class RunJournal:
+    """Records each finished shipment's result the moment it comes in, so an interrupted run can resume.
+
+    A fresh run starts an empty journal. With resume=True the existing journal is loaded and
+    finished() hands back the recorded result for shipments done before the interruption
+    (ERROR results are tracked again). The journal is deleted when the run completes cleanly:
+
+        with RunJournal(resume=args.resume) as journal:
+            ...
+    """
+
+    def __init__(self, path=JOURNAL_PATH, resume=False):
+        self.path = path
+        self.resume = resume
+        self.done = {}
+        self.resumed = 0
+        self._file = None
+
+    def __enter__(self):
+        if self.resume:
+            self._load()
+        self._file = open(self.path, 'a' if self.resume else 'w', encoding='utf-8')
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self._file.close()
+        self._file = None
+        if exc_type is None:
+            os.remove(self.path)  # finished: nothing to resume
+        else:
+            print(f"Run interrupted; {len(self.done)} finished shipment(s) kept in {self.path}, rerun with --resume")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            print(f"No run journal at {self.path}; starting from the first row")
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # last line cut short by the interruption
+                self.done[entry['key']] = entry
+        if self.done:
+            age = (time.time() - min(e['recorded_at'] for e in self.done.values())) / 60
+            print(f"Resuming: {len(self.done)} shipment(s) already finished in a run started {age:.0f} min ago")
+
+    def finished(self, key):
+        # Result recorded for this shipment by the interrupted run, or None if it still has to be tracked
+        entry = self.done.get(key)
+        if entry is None or entry['result']['status'] == ERROR:
+            return None
+        self.resumed += 1
+        return TrackingResult(**entry['result'])
+
+    def record(self, key, result):
+        if key in self.done and self.done[key]['result'] == dataclasses.asdict(result):
+            return  # carried over from the interrupted run, already in the file
+        entry = {'key': key, 'recorded_at': time.time(), 'result': dataclasses.asdict(result)}
+        self.done[key] = entry
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
@@ -0,0 +1,146 @@
+import json
+import os
+import time
+
+# --- CONFIG ---
+TRACE_ENABLED = os.getenv('TRACKING_TRACE', '1') == '1'
+# One JSON line per lookup (carrier, PROs, outcome, timed spans), appended across runs
+TRACE_PATH = os.getenv('TRACKING_TRACE_PATH', 'tracking_trace.jsonl')
+# Once the trace is over this size at the start of a run it is moved to <path>.1 (replacing the one there)
+TRACE_MAX_MB = float(os.getenv('TRACKING_TRACE_MAX_MB', '50'))
+# Prometheus text file written at the end of a run, e.g. /var/lib/node_exporter/textfile_collector/tracking.prom
+METRICS_PATH = os.getenv('TRACKING_METRICS_PATH', '')
+# Upper bounds (seconds) of the lookup latency histogram buckets
+LATENCY_BUCKETS = [0.5, 1, 2, 5, 10, 20, 30, 60, 120]
+# Phases every lookup is split into; anything else recorded with span() is traced but not exported
+SPAN_NAMES = ['launch', 'navigate', 'interact', 'extract', 'close']
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                          for k, v in labels.items()) + '}'
+
+
+def lookup_outcome(results):
+    # A batch's PROs can end differently; the lookup as a whole is tagged MIXED then
+    statuses = {r.status for r in results.values()}
+    return statuses.pop() if len(statuses) == 1 else 'MIXED'
+
+
+class RunTrace:
+    """Collects every lookup of a run: appends it to the JSONL trace as it finishes and keeps the
+    per-carrier aggregates that write_metrics() exports in Prometheus text format."""
+
+    def __init__(self, path=TRACE_PATH, enabled=TRACE_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self.started = time.time()
+        self.outcomes = {}  # (carrier, outcome) -> shipments
+        self.cache_hits = {}  # carrier -> shipments
+        self.latency = {}  # carrier -> [bucket counts..., sum, count]
+        self.spans = {}  # (carrier, span, lookup outcome) -> [seconds, count]
+        self._file = None
+
+    def record(self, carrier, results, spans, origin, total):
+        # One lookup (single or batch): results is {pro: TrackingResult}, spans are span() entries
+        outcome = lookup_outcome(results)
+        for result in results.values():
+            key = (carrier, result.status)
+            self.outcomes[key] = self.outcomes.get(key, 0) + 1
+        latency = self.latency.setdefault(carrier, [0] * len(LATENCY_BUCKETS) + [0.0, 0])
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if total <= bound:
+                latency[i] += 1
+        latency[-2] += total
+        latency[-1] += 1
+        for s in spans:
+            entry = self.spans.setdefault((carrier, s['name'], outcome), [0.0, 0])
+            entry[0] += s['seconds']
+            entry[1] += 1
+        self._write({
+            'ts': round(time.time(), 3),
+            'carrier': carrier,
+            'pros': list(results),
+            'outcome': outcome,
+            'statuses': {pro: r.status for pro, r in results.items()},
+            'seconds': round(total, 3),
+            'spans': [{'name': s['name'], 'start': round(s['start'] - origin, 3), 'seconds': s['seconds']}
+                      for s in spans],
+            'timings': next(iter(results.values())).timings if results else {},
+        })
+
+    def record_hit(self, carrier, result):
+        self.cache_hits[carrier] = self.cache_hits.get(carrier, 0) + 1
+        key = (carrier, result.status)
+        self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+    def _write(self, entry):
+        if not self.enabled:
+            return
+        if self._file is None:
+            self._rotate()
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def _rotate(self):
+        # At most two files' worth of trace on disk: the current one and the previous one
+        try:
+            if os.path.getsize(self.path) > TRACE_MAX_MB * 1024 * 1024:
+                os.replace(self.path, f"{self.path}.1")
+        except OSError:
+            pass  # no trace yet
+
+    def metrics_text(self):
+        lines = [
+            '# HELP tracking_shipments_total Shipments tracked in the last run, looked up or answered from the cache '
+            '(see tracking_cache_hits_total), by carrier and outcome.',
+            '# TYPE tracking_shipments_total counter',
+        ]
+        for (carrier, outcome), n in sorted(self.outcomes.items()):
+            lines.append(f"tracking_shipments_total{_labels(carrier=carrier, outcome=outcome)} {n}")
+        lines += ['# HELP tracking_cache_hits_total Shipments answered from the result cache in the last run.',
+                  '# TYPE tracking_cache_hits_total counter']
+        for carrier, n in sorted(self.cache_hits.items()):
+            lines.append(f"tracking_cache_hits_total{_labels(carrier=carrier)} {n}")
+        lines += ['# HELP tracking_lookup_seconds Wall time of one lookup (one page load, or one batch).',
+                  '# TYPE tracking_lookup_seconds histogram']
+        for carrier, counts in sorted(self.latency.items()):
+            for bound, n in zip(LATENCY_BUCKETS, counts):
+                lines.append(f"tracking_lookup_seconds_bucket{_labels(carrier=carrier, le=bound)} {n}")
+            lines.append(f"tracking_lookup_seconds_bucket{_labels(carrier=carrier, le='+Inf')} {counts[-1]}")
+            lines.append(f"tracking_lookup_seconds_sum{_labels(carrier=carrier)} {counts[-2]:.3f}")
+            lines.append(f"tracking_lookup_seconds_count{_labels(carrier=carrier)} {counts[-1]}")
+        lines += ['# HELP tracking_span_seconds Time spent in each lookup phase, by the outcome of the lookup.',
+                  '# TYPE tracking_span_seconds summary']
+        for (carrier, name, outcome), (seconds, n) in sorted(self.spans.items()):
+            if name in SPAN_NAMES:
+                labels = _labels(carrier=carrier, span=name, outcome=outcome)
+                lines.append(f"tracking_span_seconds_sum{labels} {seconds:.3f}")
+                lines.append(f"tracking_span_seconds_count{labels} {n}")
+        lines += ['# HELP tracking_run_duration_seconds Wall time of the last run.',
+                  '# TYPE tracking_run_duration_seconds gauge',
+                  f"tracking_run_duration_seconds {time.time() - self.started:.3f}",
+                  '# HELP tracking_run_timestamp_seconds When the last run finished.',
+                  '# TYPE tracking_run_timestamp_seconds gauge',
+                  f"tracking_run_timestamp_seconds {time.time():.0f}"]
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path=METRICS_PATH):
+        # Written to a temp file and renamed, so the node exporter never reads half a file
+        if not path:
+            return None
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.metrics_text())
+        os.replace(tmp_path, path)
+        return path
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Lookups for the whole run, exported by the orchestrators at the end
+TRACE = RunTrace()
@@ -0,0 +1,23 @@
+from request_blocking import RUN_STATS
+from circuit_breaker import BREAKERS
+from run_metrics import TRACE
+from adaptive_timeouts import TIMEOUTS
+from extraction import STRATEGY_STATS
+
+
+def finish_run():
+    # End of every tracking run: print the run-wide summaries, save what carries over to the
+    # next run (learned timeouts, extraction strategy record) and write the run's trace and metrics
+    print(RUN_STATS.summary())
+    if BREAKERS.summary():
+        print(BREAKERS.summary())
+    TIMEOUTS.save()
+    if TIMEOUTS.summary():
+        print(TIMEOUTS.summary())
+    STRATEGY_STATS.save()
+    if STRATEGY_STATS.summary():
+        print(STRATEGY_STATS.summary())
+    TRACE.close()
+    metrics_path = TRACE.write_metrics()
+    if metrics_path:
+        print(f"Run metrics written to: {metrics_path}")
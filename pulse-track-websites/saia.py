@@ -1,39 +1,101 @@
 import asyncio
-from playwright.async_api import async_playwright
 import re
+import time
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from browser_pool import open_page
+from carriers import site_url
+from waits import wait_for_any, goto, RESULTS_TIMEOUT
+from adaptive_timeouts import timed_step, step_timeout, record_step
+from operator_queue import OPERATOR
+from batching import split_by_reference
+from tracking_result import TrackingResult, DELIVERED, IN_TRANSIT, NOT_FOUND, ERROR, tracked_lookup, tracked_batch, record_timing, span
 
-async def get_saia_eta(tracking_number):
-    url = "https://www.saia.com/track"
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        page = await browser.new_page()
-        await page.goto(url)
-        # Wait for the textarea to be visible
-        await page.wait_for_selector('textarea', state='visible', timeout=20000)
+SAIA_URL = site_url("https://www.saia.com/track")
+# Anything that shows the tracking results have rendered
+RESULT_SELECTORS = [r'text=/Delivered\s+\d{2}\/\d{2}\/\d{4}/', 'text=/Estimated Delivery/']
+# True once every PRO is on the page, matched like batching.find_reference: PRO 123 inside 1234 doesn't count
+ALL_PROS_JS = r"""pros => {
+    const text = document.body.innerText;
+    const escape = p => p.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+    return pros.every(p => new RegExp('(?<!\\d)' + escape(p) + '(?!\\d)').test(text));
+}"""
 
-        # Fill the Pro Number textarea
-        await page.fill('textarea', tracking_number)
+@tracked_lookup('SAIA')
+async def get_saia_eta(tracking_number, pool=None, http=None):
+    async with open_page(pool, 'SAIA') as page:
+        with span('navigate'):
+            await goto(page, SAIA_URL)
+            # Wait for the textarea to be visible
+            with timed_step('wait_textarea', 20000, hard=True) as timeout:
+                await page.wait_for_selector('textarea', state='visible', timeout=timeout)
 
-        print("Please solve the captcha manually, then click TRACK.")
-        input("Press Enter after you have solved the captcha and clicked TRACK...")
+        with span('interact'):
+            # Fill the Pro Number textarea
+            await page.fill('textarea', tracking_number)
 
-        # Wait for results to load
-        await page.wait_for_timeout(5000)
+            if not await OPERATOR.wait_for(page, f"solve the Saia captcha for PRO {tracking_number}, then click TRACK.",
+                                           RESULT_SELECTORS):
+                return TrackingResult('SAIA', tracking_number, ERROR, message="Captcha was not solved in time.")
 
-        # Get the full page text and extract the delivery or estimated delivery date
-        full_text = await page.inner_text('body')
+            # Wait for results to load
+            await wait_for_any(page, RESULT_SELECTORS, 'results')
 
-        delivered_match = re.search(r"Delivered\s+(\d{2}/\d{2}/\d{4})", full_text)
-        if delivered_match:
-            print("Delivered", delivered_match.group(1))
-        else:
-            eta_match = re.search(r"Estimated Delivery:?\s*(\d{2}/\d{2}/\d{4})", full_text)
-            if eta_match:
-                print("eta is", eta_match.group(1))
-            else:
-                print("Could not find delivery or estimated delivery date.")
+        with span('extract'):
+            # Get the full page text and extract the delivery or estimated delivery date
+            full_text = await page.inner_text('body')
+
+            return parse_saia_text(tracking_number, full_text)
+
+@tracked_batch('SAIA')
+async def get_saia_etas(tracking_numbers, pool=None, http=None):
+    # One captcha for several PROs (all of a run's Saia PROs by default): the textarea takes one PRO per line
+    async with open_page(pool, 'SAIA') as page:
+        with span('navigate'):
+            await goto(page, SAIA_URL)
+            with timed_step('wait_textarea', 20000, hard=True) as timeout:
+                await page.wait_for_selector('textarea', state='visible', timeout=timeout)
+
+        with span('interact'):
+            await page.fill('textarea', "\n".join(tracking_numbers))
+            if not await OPERATOR.wait_for(
+                    page, f"solve the Saia captcha for {len(tracking_numbers)} PRO(s), then click TRACK.",
+                    RESULT_SELECTORS):
+                return {pro: TrackingResult('SAIA', pro, ERROR, message="Captcha was not solved in time.")
+                        for pro in tracking_numbers}
 
-        await browser.close()
+            await wait_for_any(page, RESULT_SELECTORS, 'results')
+            await wait_for_all_pros(page, tracking_numbers)
+
+        with span('extract'):
+            full_text = await page.inner_text('body')
+            chunks = split_by_reference(full_text, tracking_numbers)
+            return {pro: parse_saia_text(pro, chunks[pro]) for pro in tracking_numbers}
+
+async def wait_for_all_pros(page, tracking_numbers):
+    # A long batch can render its rows a few at a time; give the rest a chance before reading the page
+    timeout = step_timeout('wait_all_rows', RESULTS_TIMEOUT)
+    started = time.perf_counter()
+    try:
+        await page.wait_for_function(ALL_PROS_JS, arg=tracking_numbers, timeout=timeout)
+        record_step('wait_all_rows', time.perf_counter() - started)
+    except PlaywrightTimeoutError:
+        pass  # read what is there; missing PROs come back as not found (one bad PRO says nothing about latency)
+    finally:
+        record_timing('wait_all_rows', time.perf_counter() - started)
+
+def parse_saia_text(tracking_number, full_text):
+    delivered_match = re.search(r"Delivered\s+(\d{2}/\d{2}/\d{4})", full_text)
+    if delivered_match:
+        return TrackingResult('SAIA', tracking_number, DELIVERED, delivered_match.group(1),
+                              f"Delivered {delivered_match.group(1)}", full_text)
+    else:
+        eta_match = re.search(r"Estimated Delivery:?\s*(\d{2}/\d{2}/\d{4})", full_text)
+        if eta_match:
+            return TrackingResult('SAIA', tracking_number, IN_TRANSIT, eta_match.group(1),
+                                  f"eta is {eta_match.group(1)}", full_text)
+        else:
+            return TrackingResult('SAIA', tracking_number, NOT_FOUND,
+                                  message="Could not find delivery or estimated delivery date.", raw_text=full_text)
 
 if __name__ == "__main__":
-    asyncio.run(get_saia_eta("10776626490")) 
\ No newline at end of file
+    print(asyncio.run(get_saia_eta("10776626490")))
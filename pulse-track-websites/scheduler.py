@@ -0,0 +1,99 @@
+import asyncio
+import os
+from browser_pool import POOL_SIZE
+from carriers import canonical_name, find_carrier
+
+# --- CONFIG ---
+# Lookups running at once across all carriers (each one holds a pooled browser)
+GLOBAL_CONCURRENCY = int(os.getenv('TRACKING_CONCURRENCY', str(POOL_SIZE)))
+# Lookups running at once per carrier, by canonical carrier name (see carriers.py)
+CARRIER_CONCURRENCY = {
+    'XPO': 2,
+    'FORWARD AIR': 2,
+    'SEFL': 2,
+    'R&L': 2,
+    'SAIA': 1,  # captcha is solved by hand, one at a time
+}
+DEFAULT_CARRIER_CONCURRENCY = 1
+# Jobs stream_all keeps started but unfinished, which bounds how far ahead of the workers the input is read
+STREAM_BACKLOG = int(os.getenv('TRACKING_STREAM_BACKLOG', str(4 * GLOBAL_CONCURRENCY)))
+
+
+def carrier_limit_key(carrier):
+    return canonical_name(carrier)
+
+
+def needs_operator(carrier):
+    carrier = find_carrier(carrier)
+    return carrier is not None and carrier.needs_operator
+
+
+class _Limits:
+    # Global and per-carrier semaphores shared by every job of one run_all/stream_all call
+    def __init__(self, global_limit=None, carrier_limits=None):
+        self.carrier_limits = carrier_limits or CARRIER_CONCURRENCY
+        self.global_sem = asyncio.Semaphore(global_limit or GLOBAL_CONCURRENCY)
+        self.carrier_sems = {}
+
+    async def run(self, job, worker, carrier_of):
+        key = carrier_limit_key(carrier_of(job))
+        if key not in self.carrier_sems:
+            self.carrier_sems[key] = asyncio.Semaphore(self.carrier_limits.get(key, DEFAULT_CARRIER_CONCURRENCY))
+        # Take the carrier slot first so a backed-up carrier never sits on a global slot
+        async with self.carrier_sems[key]:
+            if needs_operator(carrier_of(job)):
+                # Mostly waiting on a person: runs beside the other lookups instead of taking their slot
+                return await worker(job)
+            async with self.global_sem:
+                return await worker(job)
+
+
+async def run_all(jobs, worker, carrier_of, global_limit=None, carrier_limits=None):
+    # Run worker(job) for every job concurrently and return the results in job order
+    limits = _Limits(global_limit, carrier_limits)
+    return await asyncio.gather(*(limits.run(job, worker, carrier_of) for job in jobs))
+
+
+def _unfinished(tasks):
+    # Drop finished tasks, re-raising a worker's error instead of losing it with the task
+    for task in tasks:
+        if task.done() and not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+    return [task for task in tasks if not task.done()]
+
+
+async def stream_all(jobs, worker, carrier_of, global_limit=None, carrier_limits=None, backlog=None):
+    # Like run_all, but for an iterable that is only read as jobs finish (at most `backlog` jobs
+    # started and not yet done), yielding (job, result) pairs in the order they complete.
+    limits = _Limits(global_limit, carrier_limits)
+    room = asyncio.Semaphore(backlog or STREAM_BACKLOG)
+    finished = asyncio.Queue()
+
+    async def run(job):
+        try:
+            finished.put_nowait((job, await limits.run(job, worker, carrier_of)))
+        finally:
+            room.release()
+
+    async def feed():
+        tasks = []
+        try:
+            for job in jobs:
+                await room.acquire()
+                tasks.append(asyncio.ensure_future(run(job)))
+                tasks = _unfinished(tasks)
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()  # the run is failing; don't leave lookups running behind it
+            raise
+        finally:
+            finished.put_nowait(None)
+
+    feeder = asyncio.ensure_future(feed())
+    try:
+        while (item := await finished.get()) is not None:
+            yield item
+        await feeder  # re-raise a worker's or the job iterable's error
+    finally:
+        feeder.cancel()
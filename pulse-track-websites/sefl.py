@@ -1,69 +1,205 @@
 import asyncio
-from playwright.async_api import async_playwright
+import os
 import re
+import time
+from browser_pool import open_page
+from carriers import site_url
+from http_client import with_client, html_text, parse_form, form_data
+from waits import wait_for_any, goto
+from batching import split_by_reference
+from throttle import TransientLookupError
+from extraction import extract
+from page_sessions import PAGE_SESSIONS, is_loaded
+from tracking_result import TrackingResult, DELIVERED, IN_TRANSIT, NOT_FOUND, tracked_lookup, tracked_batch, record_timing, span
 
-async def get_sefl_eta(tracking_number):
-    url = "https://sefl.com/Tracing/index.jsp"
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        page = await browser.new_page()
-        await page.goto(url)
-        await page.wait_for_timeout(3000)  # Wait for page to load
-
-        # Fill the Reference Numbers textarea
-        textareas = await page.query_selector_all('textarea')
-        if textareas:
-            await textareas[0].fill(tracking_number)
-        else:
-            await browser.close()
-            return
+# --- CONFIG ---
+SEFL_URL = site_url("https://sefl.com/Tracing/index.jsp")
+# 'http' posts the trace form directly and parses the returned HTML; 'browser' drives Chromium
+SEFL_TRANSPORT = os.getenv('SEFL_TRANSPORT', 'http')
+
+# Anything that shows the trace results have rendered
+RESULT_SELECTORS = ['td:text("Estimated Delivery:")', 'td:text("Delivered")', 'text=/Estimated Delivery:/']
+
+# Post the trace form from inside the loaded page, with its cookies, and return the results HTML.
+# The page itself never navigates, so the form is still there for the next PRO.
+SUBMIT_TRACE_JS = """async numbers => {
+    const textarea = document.querySelector('textarea');
+    const form = textarea && textarea.form;
+    if (!form) throw new Error('trace form not found');
+    textarea.value = numbers;
+    const data = new FormData(form);
+    const button = [...form.querySelectorAll('button, input[type=submit]')]
+        .find(b => (b.value || b.textContent).trim() === 'Submit Trace');
+    if (button && button.name) data.append(button.name, button.value);
+    const params = new URLSearchParams(data);
+    const post = (form.method || 'get').toLowerCase() === 'post';
+    const url = post ? form.action : form.action + (form.action.includes('?') ? '&' : '?') + params;
+    const response = await fetch(url, post ? {method: 'POST', body: params, credentials: 'same-origin'}
+                                           : {credentials: 'same-origin'});
+    if (!response.ok) throw new Error(`trace returned HTTP ${response.status}`);
+    return await response.text();
+}"""
 
-        # Click the 'Submit Trace' button
-        await page.get_by_role("button", name="Submit Trace").click()
+async def fetch_sefl_text(tracking_numbers, http=None):
+    # Browserless trace: load the form, post it with the PROs filled in, return the results page text.
+    # Returns None if the request fails so the caller can use the browser instead.
+    async def trace(client):
+        form = parse_form(await client.get_text(SEFL_URL), SEFL_URL)
+        if form is None:
+            raise RuntimeError("trace form not found")
+        data = form_data(form, "\n".join(tracking_numbers), submit_label="Submit Trace")
+        if form.method == 'post':
+            return html_text(await client.post_form(form.action, data))
+        return html_text(await client.get_text(form.action, params=data))
 
-        # Wait for results to load
-        await page.wait_for_timeout(5000)
+    started = time.perf_counter()
+    try:
+        return await with_client(http, trace)
+    except Exception as e:
+        print(f"SEFL HTTP trace failed, using the browser: {e}")
+        return None
+    finally:
+        record_timing('http', time.perf_counter() - started)
 
-        # Try to extract the estimated delivery date from the correct <td>
+async def sefl_session_trace(page, tracking_numbers):
+    # Trace through a page kept open between lookups: load the form once, then each trace is one
+    # form round-trip from inside it. Returns the results page text.
+    if not is_loaded(page, SEFL_URL):
+        with span('navigate'):
+            await goto(page, SEFL_URL)
+            await wait_for_any(page, ['textarea'], 'page')  # Wait for the reference number form
+    with span('interact'):
         try:
-            # Find the <td> with 'Estimated Delivery:' and get its next sibling
-            td = await page.query_selector('td:text("Estimated Delivery:")')
-            if td:
-                sibling = await td.evaluate_handle('node => node.nextElementSibling')
-                if sibling:
-                    eta_text = await sibling.inner_text()
-                    eta_match = re.search(r'(\d{2}/\d{2}/\d{4})', eta_text)
-                    if eta_match:
-                        print("eta is", eta_match.group(1))
-                        await browser.close()
-                        return
-            # If not found, fallback to delivered date
-            delivered_td = await page.query_selector('td:text("Delivered")')
-            if delivered_td:
-                sibling = await delivered_td.evaluate_handle('node => node.nextElementSibling')
-                if sibling:
-                    delivered_text = await sibling.inner_text()
-                    delivered_match = re.search(r'(\d{2}/\d{2}/\d{4})', delivered_text)
-                    if delivered_match:
-                        print("Delivered", delivered_match.group(1))
-                        await browser.close()
-                        return
-        except Exception:
-            pass
-
-        # Fallback: search the full page text
-        full_text = await page.inner_text('body')
-        delivered_match = re.search(r"Delivered\s+(\d{2}/\d{2}/\d{4})", full_text)
-        if delivered_match:
-            print("Delivered", delivered_match.group(1))
+            html = await page.evaluate(SUBMIT_TRACE_JS, "\n".join(tracking_numbers))
+        except Exception as e:
+            raise TransientLookupError(f"In-page trace failed: {e}")
+    return html_text(html)
+
+async def sefl_unrendered_results(tracking_numbers, pool=None, http=None):
+    # Trace without rendering the results page: the HTTP post (SEFL_TRANSPORT 'http'), or the form
+    # post from a kept page (page sessions). Only the PROs it found a date for are returned, so a 200
+    # that isn't the usual results page (bot check, new layout) leaves the rest to the rendered page.
+    if SEFL_TRANSPORT == 'http':
+        with span('navigate'):
+            full_text = await fetch_sefl_text(tracking_numbers, http)
+    elif PAGE_SESSIONS and pool is not None:
+        async with open_page(pool, 'SEFL', keep=True) as page:
+            full_text = await sefl_session_trace(page, tracking_numbers)
+    else:
+        return {}
+    if full_text is None:
+        return {}
+    with span('extract'):
+        if len(tracking_numbers) == 1:
+            chunks = {tracking_numbers[0]: full_text}
         else:
-            eta_match = re.search(r"Estimated Delivery:\s*(\d{2}/\d{2}/\d{4})", full_text)
-            if eta_match:
-                print("eta is", eta_match.group(1))
+            chunks = split_by_reference(full_text, tracking_numbers)
+        results = {pro: parse_sefl_text(pro, chunks[pro]) for pro in tracking_numbers}
+    found = {pro: result for pro, result in results.items() if result.status != NOT_FOUND}
+    if len(found) < len(results):
+        print(f"SEFL: no date in the trace HTML for {len(results) - len(found)} PRO(s), checking the rendered page")
+    return found
+
+@tracked_lookup('SEFL')
+async def get_sefl_eta(tracking_number, pool=None, http=None):
+    results = await sefl_unrendered_results([tracking_number], pool, http)
+    if tracking_number in results:
+        return results[tracking_number]
+    async with open_page(pool, 'SEFL') as page:
+        with span('navigate'):
+            await goto(page, SEFL_URL)
+            await wait_for_any(page, ['textarea'], 'page')  # Wait for the reference number form
+
+        with span('interact'):
+            # Fill the Reference Numbers textarea
+            textareas = await page.query_selector_all('textarea')
+            if textareas:
+                await textareas[0].fill(tracking_number)
             else:
-                print("Could not find delivery or estimated delivery date.")
+                raise TransientLookupError("Could not find the reference number textarea.")
+
+            # Click the 'Submit Trace' button
+            await page.get_by_role("button", name="Submit Trace").click()
+
+            # Wait for results to load
+            await wait_for_any(page, RESULT_SELECTORS, 'results')
+
+        with span('extract'):
+            return await extract('SEFL', page, tracking_number, SEFL_EXTRACTORS)
 
-        await browser.close()
+@tracked_batch('SEFL')
+async def get_sefl_etas(tracking_numbers, pool=None, http=None):
+    # One trace for several PROs: the textarea takes one reference number per line
+    results = await sefl_unrendered_results(tracking_numbers, pool, http)
+    missing = [pro for pro in tracking_numbers if pro not in results]
+    if not missing:
+        return results
+    async with open_page(pool, 'SEFL') as page:
+        with span('navigate'):
+            await goto(page, SEFL_URL)
+            await wait_for_any(page, ['textarea'], 'page')  # Wait for the reference number form
+
+        with span('interact'):
+            textareas = await page.query_selector_all('textarea')
+            if not textareas:
+                raise TransientLookupError("Could not find the reference number textarea.")
+            await textareas[0].fill("\n".join(missing))
+            await page.get_by_role("button", name="Submit Trace").click()
+            await wait_for_any(page, RESULT_SELECTORS, 'results')
+
+        with span('extract'):
+            full_text = await page.inner_text('body')
+            chunks = split_by_reference(full_text, missing)
+            results.update({pro: parse_sefl_text(pro, chunks[pro]) for pro in missing})
+    return results
+
+async def sefl_eta_cell(page, tracking_number):
+    # Find the <td> with 'Estimated Delivery:' and read the date in its next sibling.
+    # A delivered shipment is left to the other strategies, whatever order they run in.
+    td = await page.query_selector('td:text("Estimated Delivery:")')
+    if td and await page.query_selector('td:text("Delivered")') is None:
+        sibling = await td.evaluate_handle('node => node.nextElementSibling')
+        if sibling:
+            eta_text = await sibling.inner_text()
+            eta_match = re.search(r'(\d{2}/\d{2}/\d{4})', eta_text)
+            if eta_match:
+                return TrackingResult('SEFL', tracking_number, IN_TRANSIT, eta_match.group(1),
+                                      f"eta is {eta_match.group(1)}", eta_text)
+    return None
+
+async def sefl_delivered_cell(page, tracking_number):
+    # Same for the delivered date
+    delivered_td = await page.query_selector('td:text("Delivered")')
+    if delivered_td:
+        sibling = await delivered_td.evaluate_handle('node => node.nextElementSibling')
+        if sibling:
+            delivered_text = await sibling.inner_text()
+            delivered_match = re.search(r'(\d{2}/\d{2}/\d{4})', delivered_text)
+            if delivered_match:
+                return TrackingResult('SEFL', tracking_number, DELIVERED, delivered_match.group(1),
+                                      f"Delivered {delivered_match.group(1)}", delivered_text)
+    return None
+
+async def sefl_page_text(page, tracking_number):
+    # Search the full page text
+    return parse_sefl_text(tracking_number, await page.inner_text('body'))
+
+# Ways to read the trace results, in the order they were first written; extract() reorders them by their record
+SEFL_EXTRACTORS = [sefl_eta_cell, sefl_delivered_cell, sefl_page_text]
+
+def parse_sefl_text(tracking_number, full_text):
+    delivered_match = re.search(r"Delivered\s+(\d{2}/\d{2}/\d{4})", full_text)
+    if delivered_match:
+        return TrackingResult('SEFL', tracking_number, DELIVERED, delivered_match.group(1),
+                              f"Delivered {delivered_match.group(1)}", full_text)
+    else:
+        eta_match = re.search(r"Estimated Delivery:\s*(\d{2}/\d{2}/\d{4})", full_text)
+        if eta_match:
+            return TrackingResult('SEFL', tracking_number, IN_TRANSIT, eta_match.group(1),
+                                  f"eta is {eta_match.group(1)}", full_text)
+        else:
+            return TrackingResult('SEFL', tracking_number, NOT_FOUND,
+                                  message="Could not find delivery or estimated delivery date.", raw_text=full_text)
 
 if __name__ == "__main__":
-    asyncio.run(get_sefl_eta("413238172")) 
\ No newline at end of file
+    print(asyncio.run(get_sefl_eta("413238172")))
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import random
+import time
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# --- CONFIG ---
+RATE_LIMIT_ENABLED = os.getenv('TRACKING_RATE_LIMIT', '1') == '1'
+# Lookups started per second against each carrier's site, and how many may start back to back
+CARRIER_RATES = {
+    'XPO': 1.0,
+    'FORWARD AIR': 0.5,
+    'SEFL': 1.0,
+    'R&L': 0.5,
+    'SAIA': 1.0,  # paced by whoever solves the captcha anyway
+}
+DEFAULT_RATE = float(os.getenv('TRACKING_DEFAULT_RATE', '0.5'))
+BURST = int(os.getenv('TRACKING_RATE_BURST', '2'))
+# Attempts per lookup when it fails with a transient error (1 = no retries)
+MAX_ATTEMPTS = int(os.getenv('TRACKING_MAX_ATTEMPTS', '3'))
+CARRIER_MAX_ATTEMPTS = {
+    'SAIA': 1,  # a retry would mean solving the captcha again
+}
+# Backoff before retry n is a random delay up to min(BACKOFF_MAX, BACKOFF_BASE * 2**(n-1)) seconds
+BACKOFF_BASE = float(os.getenv('TRACKING_BACKOFF_BASE', '2'))
+BACKOFF_MAX = float(os.getenv('TRACKING_BACKOFF_MAX', '30'))
+# HTTP statuses worth retrying: rate limited or the site is having a bad moment
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# Playwright error text that means the page or network failed rather than the scraper
+TRANSIENT_MESSAGES = ['net::ERR_', 'Target closed', 'Target page, context or browser has been closed',
+                      'Navigation failed', 'NS_ERROR_', 'Connection closed']
+
+
+class TransientLookupError(Exception):
+    """Raised by a scraper when the page did not render what it needs (e.g. a missing row arrow);
+    the lookup is retried, and the message becomes the result if every attempt fails."""
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=BURST):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Take one token, sleeping until one is available. Returns the seconds spent waiting.
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+_buckets = {}
+
+
+async def acquire(carrier):
+    # Wait for the carrier's next request slot. Returns the seconds spent waiting.
+    if not RATE_LIMIT_ENABLED:
+        return 0.0
+    bucket = _buckets.get(carrier)
+    if bucket is None:
+        bucket = _buckets[carrier] = TokenBucket(CARRIER_RATES.get(carrier, DEFAULT_RATE))
+    return await bucket.acquire()
+
+
+def max_attempts(carrier):
+    return max(1, CARRIER_MAX_ATTEMPTS.get(carrier, MAX_ATTEMPTS))
+
+
+def backoff_delay(attempt):
+    # Exponential backoff with full jitter, so concurrent retries against one site spread out
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def is_transient(error):
+    if isinstance(error, (TransientLookupError, PlaywrightTimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    if aiohttp is not None:
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in TRANSIENT_STATUSES
+        if isinstance(error, aiohttp.ClientError):
+            return True
+    if isinstance(error, PlaywrightError):
+        return any(text in str(error) for text in TRANSIENT_MESSAGES)
+    return False
@@ -1,18 +1,22 @@
 import pandas as pd
 from datetime import datetime, timedelta
+import argparse
 import asyncio
 import re
-import io
-import sys
 import pyperclip
 import webbrowser
 import os
 
-from rnl import get_rl_eta
-from sefl import get_sefl_eta
-from saia import get_saia_eta
-from forward import get_forward_eta
-from xpo import get_xpo_eta
+from carriers import find_carrier, batch_sizes
+from browser_pool import BrowserPool, HEADLESS
+from run_summary import finish_run
+from http_client import HttpClient
+from result_cache import ResultCache
+from scheduler import run_all
+from batching import plan_batches
+from export_delta import DELTA_ENABLED, EXPORT_READ_OPTIONS, ExportDelta, row_fingerprint, shipment_key
+from run_journal import RunJournal
+from lookup_profiler import PROFILE_ENABLED, PROFILE_DIR, PROFILE_SLOW_SECONDS
 
 CSV_FILENAME = None
 import glob
@@ -55,7 +59,7 @@ def try_read_csv(filename):
     encodings = ['utf-8', 'cp1252', 'latin1']
     for enc in encodings:
         try:
-            df = pd.read_csv(filename, encoding=enc)
+            df = pd.read_csv(filename, encoding=enc, **EXPORT_READ_OPTIONS)
             print(f"Read CSV using encoding: {enc}")
             return df
         except UnicodeDecodeError:
@@ -63,9 +67,51 @@ def try_read_csv(filename):
     print(f"Failed to read CSV with encodings: {encodings}")
     exit(1)
 
-async def main():
+def has_tracking_number(row):
+    tracking_number = row['tracking_number']
+    return bool(tracking_number) and tracking_number.lower() != 'nan'
+
+def batch_key(row):
+    # Rows for a carrier with a batch lookup share one key, so they go in together
+    carrier = find_carrier(row['carrier'])
+    if not has_tracking_number(row) or carrier is None or carrier.batch_name is None:
+        return None
+    return carrier.name
+
+async def track_group(group, pool, http=None, cache=None):
+    if batch_key(group[0]) is None:
+        await track_row(group[0], pool, http, cache)
+        return
+    batch_lookup = find_carrier(group[0]['carrier']).batch_lookup()
+    results = await batch_lookup([r['tracking_number'] for r in group], pool=pool, http=http, cache=cache)
+    for row in group:
+        set_result(row, results[row['tracking_number']])
+
+async def track_row(row, pool, http=None, cache=None):
+    if not has_tracking_number(row):
+        row['status'] = "not picked up yet"
+        return
+    carrier = find_carrier(row['carrier'])
+    if carrier is None:
+        row['status'] = f"Unknown carrier: {row['carrier']}"
+        return
+    result = await carrier.lookup()(row['tracking_number'], pool=pool, http=http, cache=cache)
+    set_result(row, result)
+
+def set_result(row, result):
+    row['result'] = result
+    row['status'] = format_status(result)
+
+def format_status(result):
+    status = result.message
+    if status.lower().startswith('eta is'):
+        # Capitalize 'ETA is' for consistency
+        status = 'ETA is' + status[6:]
+    return status
+
+async def main(args):
     df = try_read_csv(CSV_FILENAME)
-    email_lines = ["Hey Muhammad,", ""]
+    rows = []
     for _, row in df.iterrows():
         if not should_track(row):
             continue
@@ -78,35 +124,50 @@ async def main():
             except Exception:
                 pass
         carrier = str(row['Carrier']).lower()
-        if not tracking_number or tracking_number.lower() == 'nan':
-            status = "not picked up yet"
-        else:
-            try:
-                old_stdout = sys.stdout
-                new_stdout = io.StringIO()
-                sys.stdout = new_stdout
-                if 'r&l' in carrier or 'rl carriers' in carrier:
-                    await get_rl_eta(tracking_number)
-                elif 'southeastern' in carrier or 'sefl' in carrier:
-                    await get_sefl_eta(tracking_number)
-                elif 'saia' in carrier:
-                    await get_saia_eta(tracking_number)
-                elif 'forward' in carrier:
-                    await get_forward_eta(tracking_number)
-                elif 'xpo' in carrier or 'xpo logistics' in carrier:
-                    await get_xpo_eta(tracking_number)
-                else:
-                    print("Unknown carrier:", carrier)
-                sys.stdout = old_stdout
-                status = new_stdout.getvalue().strip()
-                if status.lower().startswith('eta is'):
-                    # Capitalize 'ETA is' for consistency
-                    status = 'ETA is' + status[6:]
-            except Exception as e:
-                sys.stdout = old_stdout
-                status = f"Error: {str(e)}"
-        email_lines.append(bol)
-        email_lines.append(status)
+        rows.append({'bol': bol, 'tracking_number': tracking_number, 'carrier': carrier,
+                     'key': shipment_key(bol, tracking_number), 'fingerprint': row_fingerprint(row)})
+
+    # Delta mode: rows unchanged since the previous export reuse their last result
+    delta = ExportDelta() if args.delta else None
+    with RunJournal(resume=args.resume) as journal:
+        # --resume: rows finished before the interruption keep their journaled result
+        to_track = []
+        for row in rows:
+            result = journal.finished(row['key'])
+            if result is None and delta:
+                result = delta.reuse(row['key'], row['fingerprint'])
+            if result:
+                set_result(row, result)
+            else:
+                to_track.append(row)
+
+        # Track concurrently, batching carriers that take several PROs per page load.
+        # Each row gets its 'status' filled in, so the report keeps CSV row order.
+        groups = plan_batches(to_track, batch_key, sizes=batch_sizes())
+        with ResultCache() as cache:
+            async with BrowserPool(headless=args.headless, profile=args.profile) as pool, HttpClient() as http:
+                async def track_and_record(group):
+                    await track_group(group, pool, http, cache)
+                    for row in group:
+                        if 'result' in row:
+                            journal.record(row['key'], row['result'])
+
+                await run_all(groups, track_and_record, lambda g: g[0]['carrier'])
+            print(cache.summary())
+        if journal.resumed:
+            print(f"Resumed {journal.resumed} shipment(s) from the interrupted run")
+
+    if delta:
+        for row in rows:
+            if 'result' in row:
+                delta.record(row['key'], row['fingerprint'], row['result'])
+        delta.save()
+        print(delta.summary())
+
+    email_lines = ["Hey Muhammad,", ""]
+    for row in rows:
+        email_lines.append(row['bol'])
+        email_lines.append(row['status'])
         email_lines.append("")  # blank line between shipments
 
     email_body = "\n".join(email_lines).strip()
@@ -117,6 +178,7 @@ async def main():
     with open(filename, 'w') as f:
         f.write(email_body)
     print(f"Tracking results saved to: {filename}")
+    finish_run()
 
     # Copy results to clipboard and open Outlook web compose page
     pyperclip.copy(email_body)
@@ -127,5 +189,18 @@ async def main():
     webbrowser.open_new_tab(url)
     print("Paste (Ctrl+V) the tracking results into the email body.")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Track every shipment in the portal CSV export and draft the email.")
+    parser.add_argument('--delta', action='store_true', default=DELTA_ENABLED,
+                        help="only re-track rows that are new, changed or due for a refresh since the last export")
+    parser.add_argument('--headless', action='store_true', default=HEADLESS,
+                        help="run the browsers without a window (Saia still opens one for its captcha)")
+    parser.add_argument('--profile', action='store_true', default=PROFILE_ENABLED,
+                        help=f"record a Playwright trace and HAR per page, kept in {PROFILE_DIR}/ for lookups "
+                             f"that fail or take over {PROFILE_SLOW_SECONDS:.0f}s")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run, skipping shipments its journal already finished")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main(parse_args())) 
\ No newline at end of file
@@ -1,27 +1,28 @@
+import argparse
 import asyncio
+import dataclasses
+import json
 from playwright.async_api import async_playwright
 import pandas as pd
 from datetime import datetime, timedelta
 import os
 import glob
+import itertools
 import re
-import io
-import sys
-
-# Import carrier tracking functions
-from rnl import get_rl_eta
-from sefl import get_sefl_eta
-from saia import get_saia_eta
-from forward import get_forward_eta
-
-# --- CONFIG ---
-CARRIER_TRACKING_URLS = {
-    'FORWARD AIR': 'https://www.forwardair.com/tracking',
-    'SOUTHEASTERN FREIGHT LINES': 'https://sefl.com/Tracing/index.jsp',
-    'RL CARRIERS': 'https://www2.rlcarriers.com/freight/shipping/shipment-tracing',
-    'SAIA': 'https://www.saia.com/track',
-    'XPO LOGISTICS': 'https://www.xpo.com/track/',
-}
+
+from carriers import find_carrier, batch_sizes
+from browser_pool import BrowserPool, HEADLESS
+from run_summary import finish_run
+from http_client import HttpClient
+from result_cache import ResultCache
+from scheduler import stream_all
+from batching import stream_batches
+from export_delta import DELTA_ENABLED, EXPORT_READ_OPTIONS, ExportDelta, row_fingerprint, shipment_key
+from run_journal import RunJournal
+from lookup_profiler import PROFILE_ENABLED, PROFILE_DIR, PROFILE_SLOW_SECONDS
+
+# Rows read from the CSV at a time; the reader only gets ahead of the trackers by a few of these
+READ_CHUNK_ROWS = int(os.getenv('TRACKING_READ_CHUNK_ROWS', '500'))
 
 CSV_FILENAME = None
 for file in glob.glob("*.csv"):
@@ -35,93 +36,126 @@ else:
     print(f"Using CSV file: {CSV_FILENAME}")
 
 # --- MAIN SCRIPT ---
-async def main():
-    # 1. Read the CSV file
+async def main(args):
     if not os.path.exists(CSV_FILENAME):
         print(f'CSV file {CSV_FILENAME} not found!')
         return
-    df = pd.read_csv(CSV_FILENAME)
-
-    # 2. Prepare shipment list
-    shipments = []
-    for _, row in df.iterrows():
-        carrier = str(row['Carrier']).strip().upper()
-        bol = str(row['BOL #']).strip()
-        pro = str(row['PRO/Tracking#']).strip()
-        eta = str(row.get('Estimated Delivery Date', '')).strip()
-        status = str(row.get('Status', '')).strip().lower()
-        if 'voided' in status:
-            continue  # Skip voided shipments
-        shipment = {
-            'carrier': carrier,
-            'bol': bol,
-            'pro': pro,
-            'eta': None,
-            'raw_eta': eta,
-            'status': status,
-        }
-        # If tracking number is empty, mark as pending pickup
-        if not pro or pro.lower() == 'nan':
-            shipment['eta'] = 'Pending Pickup'
-        shipments.append(shipment)
-
-    # 3. Track shipments with tracking numbers using carrier-specific functions
-    for shipment in shipments:
-        if shipment['eta'] == 'Pending Pickup':
-            continue
-        carrier = shipment['carrier'].lower()
-        pro = shipment['pro']
-        
-        try:
-            if 'r&l' in carrier:
-                # Capture the output from get_rl_eta
-                old_stdout = sys.stdout
-                new_stdout = io.StringIO()
-                sys.stdout = new_stdout
-                await get_rl_eta(pro)
-                output = new_stdout.getvalue().strip()
-                sys.stdout = old_stdout
-                shipment['eta'] = output
-            elif 'southeastern' in carrier or 'sefl' in carrier:
-                old_stdout = sys.stdout
-                new_stdout = io.StringIO()
-                sys.stdout = new_stdout
-                await get_sefl_eta(pro)
-                output = new_stdout.getvalue().strip()
-                sys.stdout = old_stdout
-                shipment['eta'] = output
-            elif 'saia' in carrier:
-                old_stdout = sys.stdout
-                new_stdout = io.StringIO()
-                sys.stdout = new_stdout
-                await get_saia_eta(pro)
-                output = new_stdout.getvalue().strip()
-                sys.stdout = old_stdout
-                shipment['eta'] = output
-            elif 'forward' in carrier:
-                old_stdout = sys.stdout
-                new_stdout = io.StringIO()
-                sys.stdout = new_stdout
-                await get_forward_eta(pro)
-                output = new_stdout.getvalue().strip()
-                sys.stdout = old_stdout
-                shipment['eta'] = output
+
+    # Delta mode: rows unchanged since the previous export reuse their last result
+    delta = ExportDelta() if args.delta else None
+
+    # Read -> track -> write as a pipeline: each shipment is written as soon as it has a result,
+    # and journaled so an interrupted run can pick up where it stopped (--resume)
+    with RunJournal(resume=args.resume) as journal, ReportWriter() as writer, ResultCache() as cache:
+        shipments = read_shipments(CSV_FILENAME, delta, journal)
+        async with BrowserPool(headless=args.headless, profile=args.profile) as pool, HttpClient() as http:
+            async for shipment in track_shipments(shipments, pool, http, cache):
+                if 'result' in shipment:
+                    journal.record(shipment['key'], shipment['result'])
+                    if delta:
+                        delta.record(shipment['key'], shipment['fingerprint'], shipment['result'])
+                writer.write(shipment)
+        print(cache.summary())
+        if journal.resumed:
+            print(f"Resumed {journal.resumed} shipment(s) from the interrupted run")
+
+    if delta:
+        delta.save()
+        print(delta.summary())
+
+    print(f"Tracking results saved to: {writer.path} ({writer.jsonl_path})")
+    finish_run()
+
+def read_shipments(filename, delta=None, journal=None):
+    # Reader stage: one shipment per non-voided CSV row, reading the file a chunk at a time.
+    # Pending pickups, shipments finished before an interruption and rows reused from the
+    # previous export come out with their 'eta' already set.
+    # Every column is read as text, so a chunk that happens to hold only numeric PROs doesn't turn them into floats
+    # 'row' numbers the shipments in CSV order, so the report can be put back in that order
+    rows = itertools.count()
+    for df in pd.read_csv(filename, chunksize=READ_CHUNK_ROWS, **EXPORT_READ_OPTIONS):
+        for _, row in df.iterrows():
+            carrier = str(row['Carrier']).strip().upper()
+            bol = str(row['BOL #']).strip()
+            pro = str(row['PRO/Tracking#']).strip()
+            eta = str(row.get('Estimated Delivery Date', '')).strip()
+            status = str(row.get('Status', '')).strip().lower()
+            if 'voided' in status:
+                continue  # Skip voided shipments
+            shipment = {
+                'row': next(rows),
+                'carrier': carrier,
+                'bol': bol,
+                'pro': pro,
+                'eta': None,
+                'raw_eta': eta,
+                'status': status,
+                'key': shipment_key(bol, pro),
+                'fingerprint': row_fingerprint(row),
+            }
+            # If tracking number is empty, mark as pending pickup
+            if not pro or pro.lower() == 'nan':
+                shipment['eta'] = 'Pending Pickup'
+                yield shipment
+                continue
+            result = journal.finished(shipment['key']) if journal else None
+            if result is None and delta:
+                result = delta.reuse(shipment['key'], shipment['fingerprint'])
+            if result:
+                shipment['result'] = result
+                shipment['eta'] = result.message
+            yield shipment
+
+async def track_shipments(shipments, pool, http=None, cache=None):
+    # Tracking stage: yields every shipment once it has its 'eta', in the order they finish.
+    # Shipments that need no lookup are passed straight through.
+    passed = asyncio.Queue()
+
+    def pending():
+        for shipment in shipments:
+            if shipment['eta'] is None:
+                yield shipment
             else:
-                shipment['eta'] = 'Unknown Carrier'
-        except Exception as e:
-            shipment['eta'] = f'Error: {str(e)}'
+                passed.put_nowait(shipment)
 
-    # 4. Filter shipments: not delivered or delivered within last 3 days
-    filtered_shipments = filter_shipments(shipments)
+    groups = stream_batches(pending(), batch_key, sizes=batch_sizes())
+    tracked = stream_all(groups, lambda g: track_group(g, pool, http, cache), lambda g: g[0]['carrier'])
+    async for group, _ in tracked:
+        while not passed.empty():
+            yield passed.get_nowait()
+        for shipment in group:
+            yield shipment
+    while not passed.empty():
+        yield passed.get_nowait()
 
-    # 5. Write results to file
-    write_results_to_file(filtered_shipments)
+async def track_group(group, pool, http=None, cache=None):
+    carrier = find_carrier(group[0]['carrier'])
+    batch_lookup = carrier.batch_lookup() if carrier else None
+    if batch_lookup is None:
+        await track_shipment(group[0], pool, http, cache)
+        return
+    results = await batch_lookup([s['pro'] for s in group], pool=pool, http=http, cache=cache)
+    for shipment in group:
+        shipment['result'] = results[shipment['pro']]
+        shipment['eta'] = shipment['result'].message
+
+async def track_shipment(shipment, pool, http=None, cache=None):
+    carrier = find_carrier(shipment['carrier'])
+    if carrier is None:
+        shipment['eta'] = 'Unknown Carrier'
+        return
+    result = await carrier.lookup()(shipment['pro'], pool=pool, http=http, cache=cache)
+    shipment['result'] = result
+    shipment['eta'] = result.message
+
+def batch_key(shipment):
+    # Shipments for a carrier with a batch lookup share one key, so they go in together
+    carrier = find_carrier(shipment['carrier'])
+    return carrier.name if carrier and carrier.batch_name else None
 
 def get_tracking_url(carrier):
-    for key in CARRIER_TRACKING_URLS:
-        if key in carrier:
-            return CARRIER_TRACKING_URLS[key]
-    return None
+    carrier = find_carrier(carrier)
+    return carrier.tracking_url if carrier else None
 
 def is_today_or_prev_business_day(date_obj):
     today = datetime.now().date()
@@ -132,44 +166,95 @@ def is_today_or_prev_business_day(date_obj):
         prev_business_day = today - timedelta(days=1)
     return date_obj == today or date_obj == prev_business_day
 
-def filter_shipments(shipments):
-    filtered = []
-    for s in shipments:
-        status = s.get('status', '').lower()
-        eta = s.get('eta', '').lower()
-        if 'void' in status:
-            continue  # Skip void/voided
-        if 'delivered' in status:
-            # Try to parse the delivered date from eta
-            match = re.search(r'(\d{2}/\d{2}/\d{4})', eta)
-            if match:
-                try:
-                    delivered_date = datetime.strptime(match.group(1), '%m/%d/%Y').date()
-                    if is_today_or_prev_business_day(delivered_date):
-                        filtered.append(s)
-                except Exception:
-                    continue  # Skip if date can't be parsed
-            # If can't parse, skip
-        else:
-            filtered.append(s)
-    return filtered
-
-def write_results_to_file(shipments):
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"tracking_results_{timestamp}.txt"
-    
-    with open(filename, 'w') as f:
-        f.write("Unishippers Tracking Results\n")
-        f.write("=" * 50 + "\n\n")
-        
-        for s in shipments:
-            f.write(f"BOL: {s['bol']}\n")
-            f.write(f"Carrier: {s['carrier']}\n")
-            f.write(f"PRO: {s['pro']}\n")
-            f.write(f"Status: {s.get('eta', 'N/A')}\n")
-            f.write("-" * 30 + "\n")
-    
-    print(f"Tracking results saved to: {filename}")
+def should_report(s):
+    # Report everything not delivered, and deliveries from today or the previous business day
+    status = s.get('status', '').lower()
+    eta = s.get('eta', '').lower()
+    if 'void' in status:
+        return False  # Skip void/voided
+    if 'delivered' in status:
+        # Try to parse the delivered date from eta
+        match = re.search(r'(\d{2}/\d{2}/\d{4})', eta)
+        if match:
+            try:
+                delivered_date = datetime.strptime(match.group(1), '%m/%d/%Y').date()
+                return is_today_or_prev_business_day(delivered_date)
+            except Exception:
+                return False  # Skip if date can't be parsed
+        return False  # If can't parse, skip
+    return True
+
+class ReportWriter:
+    """Writer stage: appends each tracked shipment to tracking_results_<timestamp>.jsonl (all of them)
+    as it arrives, and to .txt (the ones should_report keeps) in CSV row order, flushing after every
+    shipment so the files show progress during the run and keep everything finished so far if it dies.
+
+    Shipments finish out of order, so the .txt holds back the ones that arrive ahead of an earlier
+    row until that row is written; whatever is still held back at the end is written in row order.
+    """
+
+    def __init__(self, timestamp=None):
+        timestamp = timestamp or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.path = f"tracking_results_{timestamp}.txt"
+        self.jsonl_path = f"tracking_results_{timestamp}.jsonl"
+        self._text = None
+        self._jsonl = None
+        self._held = {}  # row -> shipment that finished before an earlier row
+        self._next_row = 0
+
+    def __enter__(self):
+        self._text = open(self.path, 'w')
+        self._jsonl = open(self.jsonl_path, 'w', encoding='utf-8')
+        self._text.write("Unishippers Tracking Results\n")
+        self._text.write("=" * 50 + "\n\n")
+        self._text.flush()
+        return self
+
+    def __exit__(self, *exc):
+        for row in sorted(self._held):
+            self._write_text(self._held.pop(row))
+        self._text.close()
+        self._jsonl.close()
+
+    def write(self, s):
+        result = s.get('result')
+        record = {
+            'bol': s['bol'],
+            'carrier': s['carrier'],
+            'pro': s['pro'],
+            'eta': s.get('eta'),
+            'portal_status': s.get('status'),
+            'reported': should_report(s),
+            'result': {k: v for k, v in dataclasses.asdict(result).items() if k != 'raw_text'} if result else None,
+        }
+        self._jsonl.write(json.dumps(record) + "\n")
+        self._jsonl.flush()
+        self._held[s['row']] = s
+        while self._next_row in self._held:
+            self._write_text(self._held.pop(self._next_row))
+            self._next_row += 1
+
+    def _write_text(self, s):
+        if should_report(s):
+            self._text.write(f"BOL: {s['bol']}\n")
+            self._text.write(f"Carrier: {s['carrier']}\n")
+            self._text.write(f"PRO: {s['pro']}\n")
+            self._text.write(f"Status: {s.get('eta', 'N/A')}\n")
+            self._text.write("-" * 30 + "\n")
+            self._text.flush()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Track the shipments in the portal CSV export and write the results file.")
+    parser.add_argument('--delta', action='store_true', default=DELTA_ENABLED,
+                        help="only re-track rows that are new, changed or due for a refresh since the last export")
+    parser.add_argument('--headless', action='store_true', default=HEADLESS,
+                        help="run the browsers without a window (Saia still opens one for its captcha)")
+    parser.add_argument('--profile', action='store_true', default=PROFILE_ENABLED,
+                        help=f"record a Playwright trace and HAR per page, kept in {PROFILE_DIR}/ for lookups "
+                             f"that fail or take over {PROFILE_SLOW_SECONDS:.0f}s")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run, skipping shipments its journal already finished")
+    return parser.parse_args()
 
 if __name__ == '__main__':
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main(parse_args())) 
\ No newline at end of file
@@ -0,0 +1,223 @@
+import asyncio
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from circuit_breaker import BREAKERS, CarrierUnavailableError
+from throttle import TransientLookupError, acquire, max_attempts, backoff_delay, is_transient
+from run_metrics import TRACE
+from lookup_profiler import PROFILE_SLOW_SECONDS, keep_captures, discard_captures
+
+# Result statuses (the first two match the spreadsheet's Status column)
+DELIVERED = 'DELIVERED'
+IN_TRANSIT = 'IN TRANSIT'
+NOT_FOUND = 'NOT FOUND'
+ERROR = 'ERROR'
+
+
+@dataclass
+class TrackingResult:
+    carrier: str
+    pro: str
+    status: str = NOT_FOUND
+    date: str = ''  # delivered date or ETA, MM/DD/YYYY
+    message: str = ''  # one-line summary used in the reports, e.g. "eta is 07/30/2025"
+    raw_text: str = ''  # page text the result was read from
+    timings: dict = field(default_factory=dict)  # seconds per step, plus retries and batch_size counts
+    error: str = ''
+    cached: bool = False  # served from the result cache without a page load
+
+    def __str__(self):
+        return self.message
+
+
+# Timings recorded by helpers (e.g. waits) during the lookup running in the current task
+_current_timings = contextvars.ContextVar('current_timings', default=None)
+
+
+def record_timing(name, seconds):
+    timings = _current_timings.get()
+    if timings is not None:
+        timings[name] = round(timings.get(name, 0) + seconds, 3)
+
+
+# Phases (launch, navigate, interact, extract, close) timed by span() during the current lookup
+_current_spans = contextvars.ContextVar('current_spans', default=None)
+
+
+@contextmanager
+def span(name):
+    # Times one phase of the lookup: added to its timings and to its entry in the run trace
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        record_timing(name, seconds)
+        spans = _current_spans.get()
+        if spans is not None:
+            spans.append({'name': name, 'start': started, 'seconds': round(seconds, 3)})
+
+
+# Carrier of the lookup running in the current task, for helpers that only get a page (e.g. adaptive timeouts)
+_current_carrier = contextvars.ContextVar('current_carrier', default=None)
+
+
+def current_carrier():
+    return _current_carrier.get()
+
+
+# Trace/HAR capture directories of the browser pages opened by the current lookup (profiling mode)
+_current_captures = contextvars.ContextVar('current_captures', default=None)
+
+
+def hold_capture(capture_dir):
+    # Hands a page's capture to the running lookup, which keeps it only if the lookup is slow or fails.
+    # False outside a tracked lookup: the caller discards it.
+    captures = _current_captures.get()
+    if captures is None:
+        return False
+    captures.append(capture_dir)
+    return True
+
+
+def settle_captures(captures, carrier, results, seconds):
+    if not captures:
+        return
+    failed = sorted({r.status for r in results.values()} & {ERROR, NOT_FOUND})
+    if failed:
+        reason = failed[0].lower().replace(' ', '-')
+    elif seconds >= PROFILE_SLOW_SECONDS:
+        reason = 'slow'
+    else:
+        discard_captures(captures)
+        return
+    path = keep_captures(captures, carrier, results, seconds, reason)
+    print(f"{carrier}: lookup {reason}, trace and HAR saved to {path}")
+
+
+def error_result(carrier, pro, e):
+    if isinstance(e, (TransientLookupError, CarrierUnavailableError)):
+        return TrackingResult(carrier, pro, ERROR, message=str(e), error=str(e))
+    return TrackingResult(carrier, pro, ERROR, message=f"Error: {str(e)}", error=str(e))
+
+
+async def attempt(carrier, call):
+    # Run call() within the carrier's rate limit, retrying transient errors with backoff.
+    # Re-raises the last error once attempts run out or the error is not transient, and
+    # raises CarrierUnavailableError without calling while the carrier's circuit is open.
+    if not BREAKERS.allow(carrier):
+        raise CarrierUnavailableError(carrier)
+    attempts = max_attempts(carrier)
+    token = _current_carrier.set(carrier)
+    try:
+        for n in range(1, attempts + 1):
+            record_timing('wait_rate_limit', await acquire(carrier))
+            try:
+                result = await call()
+                BREAKERS.record_success(carrier)
+                return result
+            except Exception as e:
+                if n == attempts or not is_transient(e):
+                    BREAKERS.record_failure(carrier)
+                    raise
+                delay = backoff_delay(n)
+                print(f"{carrier}: {e!r} on attempt {n} of {attempts}, retrying in {delay:.1f}s")
+                record_timing('backoff', delay)
+                record_timing('retries', 1)
+                await asyncio.sleep(delay)
+    finally:
+        _current_carrier.reset(token)
+
+
+def tracked_lookup(carrier):
+    # Decorator for get_*_eta functions: times the lookup, retries transient errors and turns
+    # exceptions into ERROR results.
+    # With cache=ResultCache(...), a fresh cached result is returned without running the lookup.
+    def decorate(lookup):
+        @functools.wraps(lookup)
+        async def wrapper(pro, *args, cache=None, **kwargs):
+            if cache is not None:
+                hit = cache.get(carrier, pro)
+                if hit is not None:
+                    TRACE.record_hit(carrier, hit)
+                    return hit
+            timings, spans, captures = {}, [], []
+            token = _current_timings.set(timings)
+            spans_token = _current_spans.set(spans)
+            captures_token = _current_captures.set(captures)
+            started = time.perf_counter()
+            skipped = False
+            try:
+                result = await attempt(carrier, lambda: lookup(pro, *args, **kwargs))
+            except CarrierUnavailableError as e:
+                result = error_result(carrier, pro, e)
+                skipped = True  # nothing was looked up, so nothing to cache
+            except Exception as e:
+                result = error_result(carrier, pro, e)
+            finally:
+                _current_timings.reset(token)
+                _current_spans.reset(spans_token)
+                _current_captures.reset(captures_token)
+            result.timings.update(timings)
+            result.timings['total'] = round(time.perf_counter() - started, 3)
+            TRACE.record(carrier, {pro: result}, spans, started, result.timings['total'])
+            settle_captures(captures, carrier, {pro: result}, result.timings['total'])
+            if cache is not None and not skipped:
+                cache.put(result)
+            return result
+        return wrapper
+    return decorate
+
+
+def tracked_batch(carrier):
+    # Decorator for get_*_etas batch functions, which return {pro: TrackingResult}.
+    # Every PRO gets a result: ERROR if the page load failed, NOT_FOUND if it was missing from the page.
+    def decorate(lookup):
+        @functools.wraps(lookup)
+        async def wrapper(pros, *args, cache=None, **kwargs):
+            pros = list(dict.fromkeys(pros))
+            hits = {}
+            if cache is not None:
+                for pro in pros:
+                    hit = cache.get(carrier, pro)
+                    if hit is not None:
+                        hits[pro] = hit
+                        TRACE.record_hit(carrier, hit)
+                pros = [pro for pro in pros if pro not in hits]
+                if not pros:
+                    return hits
+            timings, spans, captures = {}, [], []
+            token = _current_timings.set(timings)
+            spans_token = _current_spans.set(spans)
+            captures_token = _current_captures.set(captures)
+            started = time.perf_counter()
+            skipped = False
+            try:
+                results = await attempt(carrier, lambda: lookup(pros, *args, **kwargs))
+            except CarrierUnavailableError as e:
+                results = {pro: error_result(carrier, pro, e) for pro in pros}
+                skipped = True
+            except Exception as e:
+                results = {pro: error_result(carrier, pro, e) for pro in pros}
+            finally:
+                _current_timings.reset(token)
+                _current_spans.reset(spans_token)
+                _current_captures.reset(captures_token)
+            elapsed = round(time.perf_counter() - started, 3)
+            for pro in pros:
+                result = results.setdefault(
+                    pro, TrackingResult(carrier, pro, NOT_FOUND, message="Not found in batch results."))
+                result.timings.update(timings)
+                result.timings['total'] = elapsed
+                result.timings['batch_size'] = len(pros)
+                if cache is not None and not skipped:
+                    cache.put(result)
+            looked_up = {pro: results[pro] for pro in pros}
+            TRACE.record(carrier, looked_up, spans, started, elapsed)
+            settle_captures(captures, carrier, looked_up, elapsed)
+            results.update(hits)
+            return results
+        return wrapper
+    return decorate
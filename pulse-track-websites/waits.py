@@ -0,0 +1,48 @@
+import os
+import time
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from tracking_result import record_timing
+from adaptive_timeouts import step_timeout, record_step, timed_step
+
+# --- CONFIG ---
+# Longest wait for a results selector before falling back to network idle (ms)
+RESULTS_TIMEOUT = int(os.getenv('TRACKING_RESULTS_TIMEOUT', '15000'))
+# Longest wait for the network to go quiet when no results selector showed up (ms)
+NETWORK_IDLE_TIMEOUT = int(os.getenv('TRACKING_NETWORK_IDLE_TIMEOUT', '5000'))
+# Longest wait for a page load (ms), Playwright's own default
+GOTO_TIMEOUT = int(os.getenv('TRACKING_GOTO_TIMEOUT', '30000'))
+
+
+async def wait_for_any(page, selectors, name, timeout=RESULTS_TIMEOUT, adaptive=True):
+    # Return as soon as any selector is on the page instead of sleeping a fixed time.
+    # If none shows up, wait for network idle so a slow page still gets a chance, and return False.
+    # The time actually spent is added to the lookup's timings as wait_<name>.
+    # `timeout` (ms) is the starting point; once the carrier has a history for this wait it adapts to it.
+    # adaptive=False keeps `timeout` as given and leaves the history alone (waits on a person, not the site).
+    # A selector that never shows is often a normal answer (a PRO the carrier doesn't know), so only hits are recorded.
+    step = f"wait_{name}"
+    if adaptive:
+        timeout = step_timeout(step, timeout)
+    locator = page.locator(selectors[0])
+    for selector in selectors[1:]:
+        locator = locator.or_(page.locator(selector))
+    started = time.perf_counter()
+    try:
+        await locator.first.wait_for(state='attached', timeout=timeout)
+        if adaptive:
+            record_step(step, time.perf_counter() - started)
+        return True
+    except PlaywrightTimeoutError:
+        try:
+            await page.wait_for_load_state('networkidle', timeout=NETWORK_IDLE_TIMEOUT)
+        except PlaywrightTimeoutError:
+            pass
+        return False
+    finally:
+        record_timing(step, time.perf_counter() - started)
+
+
+async def goto(page, url, timeout=GOTO_TIMEOUT):
+    # page.goto with the carrier's adaptive page-load timeout (`timeout` ms until it has a history)
+    with timed_step('goto', timeout, hard=True) as goto_timeout:
+        return await page.goto(url, timeout=goto_timeout)
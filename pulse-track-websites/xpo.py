@@ -1,22 +1,140 @@
 import asyncio
-from playwright.async_api import async_playwright
+import os
 import re
+import time
 from datetime import datetime
+from urllib.parse import quote
+from browser_pool import open_page
+from carriers import site_url
+from http_client import with_client
+from waits import wait_for_any, goto
+from adaptive_timeouts import timed_step
+from extraction import extract
+from page_sessions import PAGE_SESSIONS, is_loaded, route_in_page
+from response_capture import CAPTURE_RESPONSES, JsonCapture, find_value, find_record, to_us_date, payload_text
+from tracking_result import TrackingResult, IN_TRANSIT, NOT_FOUND, tracked_lookup, record_timing, span
 
-async def get_xpo_eta(tracking_number):
-    url = f"https://ext-web.ltl-xpo.com/public-app/shipments?referenceNumber={tracking_number}"
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        page = await browser.new_page()
-        try:
-            await page.goto(url, timeout=90000)
+# --- CONFIG ---
+# Ask the shipment endpoint directly over HTTP before loading the public app in a browser
+XPO_HTTP = os.getenv('XPO_HTTP', '1') == '1'
+# Shipment endpoint the public app calls; point it at a local stub server to test offline
+XPO_API_URL = os.getenv('XPO_API_URL') or site_url('https://ext-web.ltl-xpo.com/api/public-app/shipments?referenceNumber={pro}')
+# Public tracking app, loaded when the endpoint gives no answer
+XPO_APP_URL = site_url('https://ext-web.ltl-xpo.com/public-app/shipments?referenceNumber={pro}')
+
+# Keys the public app's shipment JSON may carry the estimated delivery date under
+XPO_ETA_KEYS = ['estimatedDeliveryDate', 'estimatedDeliveryDt', 'estimatedDelivery']
+
+def is_xpo_api(url):
+    return 'ltl-xpo.com' in url and 'shipment' in url.lower()
+
+def extract_xpo_eta(payload):
+    value = find_value(payload, XPO_ETA_KEYS)
+    return to_us_date(value) if value else None
+
+def payload_result(payload, tracking_number):
+    # Result for this PRO's shipment record in a payload, or None if the payload is about another shipment
+    record = find_record(payload, tracking_number)
+    eta = extract_xpo_eta(record) if record else None
+    if eta:
+        return TrackingResult('XPO', tracking_number, IN_TRANSIT, eta, f"eta is {eta}", payload_text(record))
+    return None
+
+async def fetch_xpo_eta(tracking_number, http=None):
+    # Browserless lookup: one JSON request on the pooled HTTP session. Returns None on any failure.
+    url = XPO_API_URL.format(pro=quote(tracking_number))
+    started = time.perf_counter()
+    try:
+        payload = await with_client(http, lambda client: client.get_json(url))
+    except Exception as e:
+        print(f"XPO HTTP lookup failed for {tracking_number}, using the browser: {e}")
+        return None
+    finally:
+        record_timing('http', time.perf_counter() - started)
+    eta = extract_xpo_eta(payload)
+    if eta:
+        return TrackingResult('XPO', tracking_number, IN_TRANSIT, eta, f"eta is {eta}", payload_text(payload))
+    return None
+
+def xpo_date_result(tracking_number, text):
+    # Use regex to find 'ESTIMATED DELIVERY DATE' (case-insensitive) followed by a date
+    match = re.search(r'ESTIMATED DELIVERY DATE\s*([0-9]{2}/[0-9]{2}/[0-9]{2,4})', text, re.IGNORECASE)
+    if not match:
+        return None
+    # Convert MM/DD/YY to MM/DD/YYYY if needed
+    date_str = match.group(1)
+    if re.match(r'\d{2}/\d{2}/\d{2}$', date_str):
+        # Expand 2-digit year
+        mm, dd, yy = date_str.split('/')
+        year = int(yy)
+        if year < 50:
+            yyyy = 2000 + year
+        else:
+            yyyy = 1900 + year
+        date_str = f"{mm}/{dd}/{yyyy}"
+    return TrackingResult('XPO', tracking_number, IN_TRANSIT, date_str, f"eta is {date_str}", text)
+
+async def xpo_label_row(page, tracking_number):
+    # Only the row holding the Estimated Delivery Date label and its value
+    label = page.locator(':text("Estimated Delivery Date")')
+    if await label.count() == 0:
+        return None
+    return xpo_date_result(tracking_number, await label.first.evaluate('el => el.parentElement.innerText'))
+
+async def xpo_page_text(page, tracking_number):
+    # The whole page text
+    all_text = await page.inner_text('body')
+    return xpo_date_result(tracking_number, all_text) or TrackingResult(
+        'XPO', tracking_number, NOT_FOUND, message="Could not find Estimated Delivery Date in page text.",
+        raw_text=all_text)
+
+# Ways to read the shipment details, the targeted label query first: the page-text regex hits whenever it does,
+# so declared after it the label row would never record a hit. extract() reorders them by their record.
+XPO_EXTRACTORS = [xpo_label_row, xpo_page_text]
+
+@tracked_lookup('XPO')
+async def get_xpo_eta(tracking_number, pool=None, http=None):
+    if XPO_HTTP:
+        with span('navigate'):
+            result = await fetch_xpo_eta(tracking_number, http)
+        if result:
+            return result
+    url = XPO_APP_URL.format(pro=tracking_number)
+    async with open_page(pool, 'XPO', keep=PAGE_SESSIONS) as page:
+        with span('navigate'):
+            reused = is_loaded(page, url)
+            if CAPTURE_RESPONSES and reused:
+                # The app is still open from the last lookup: switch it to this PRO through its router.
+                # Only a payload with this PRO's record counts; a late one for the previous PRO is ignored.
+                capture = JsonCapture(page, is_xpo_api, lambda payload: payload_result(payload, tracking_number))
+                result = await route_in_page(page, 'XPO', url, capture)
+                if result:
+                    return result
+            if CAPTURE_RESPONSES and reused:
+                # Reload the kept page; a late response for the previous PRO can still arrive, so again
+                # only a payload with this PRO's record counts
+                capture = JsonCapture(page, is_xpo_api, lambda payload: payload_result(payload, tracking_number))
+                result = await capture.wait(goto(page, url, timeout=90000))
+                if result:
+                    return result
+            elif CAPTURE_RESPONSES:
+                # Take the date from the app's backend JSON as soon as it arrives and skip the DOM
+                capture = JsonCapture(page, is_xpo_api, extract_xpo_eta)
+                eta = await capture.wait(goto(page, url, timeout=90000))
+                if eta:
+                    return TrackingResult('XPO', tracking_number, IN_TRANSIT, eta, f"eta is {eta}",
+                                          payload_text(capture.payload))
+            else:
+                await goto(page, url, timeout=90000)
+        # No payload seen: fall back to scraping the rendered page
+        with span('interact'):
             # Wait for the 'Shipment Details' tab to be visible and click it
             try:
-                await page.wait_for_selector('div.mat-tab-label-content:has-text("Shipment Details")', state='visible', timeout=10000)
+                with timed_step('wait_tab', 10000) as timeout:
+                    await page.wait_for_selector('div.mat-tab-label-content:has-text("Shipment Details")', state='visible', timeout=timeout)
                 shipment_details_btn = await page.query_selector('div.mat-tab-label-content:has-text("Shipment Details")')
                 if shipment_details_btn:
                     await shipment_details_btn.click(force=True)
-                    await page.wait_for_timeout(1000)
                 else:
                     print("Shipment Details tab not found or not visible. Printing all tab texts for debugging:")
                     tab_labels = await page.query_selector_all('div.mat-tab-label-content')
@@ -28,38 +146,19 @@ async def get_xpo_eta(tracking_number):
                 for tab in tab_labels:
                     print(await tab.text_content())
                 pass  # If not found, continue
+        with span('extract'):
             # Wait for the Estimated Delivery Date label to appear
-            await page.wait_for_selector(':text("Estimated Delivery Date")', timeout=30000)
-            # Find the label and extract the date value next to it
-            all_text = await page.inner_text('body')
-            # Use regex to find 'ESTIMATED DELIVERY DATE' (case-insensitive) followed by a date
-            match = re.search(r'ESTIMATED DELIVERY DATE\s*([0-9]{2}/[0-9]{2}/[0-9]{2,4})', all_text, re.IGNORECASE)
-            if match:
-                # Convert MM/DD/YY to MM/DD/YYYY if needed
-                date_str = match.group(1)
-                if re.match(r'\d{2}/\d{2}/\d{2}$', date_str):
-                    # Expand 2-digit year
-                    mm, dd, yy = date_str.split('/')
-                    year = int(yy)
-                    if year < 50:
-                        yyyy = 2000 + year
-                    else:
-                        yyyy = 1900 + year
-                    date_str = f"{mm}/{dd}/{yyyy}"
-                print(f"eta is {date_str}")
-            else:
-                print("Could not find Estimated Delivery Date in page text.")
-                print(all_text)
-        except Exception as e:
-            print(f"Error: {str(e)}")
-        finally:
-            await browser.close()
+            await wait_for_any(page, [':text("Estimated Delivery Date")'], 'details', timeout=30000)
+            return await extract('XPO', page, tracking_number, XPO_EXTRACTORS)
 
 # For manual testing
 if __name__ == "__main__":
     import sys
     tracking = sys.argv[1] if len(sys.argv) > 1 else ""
     if tracking:
-        asyncio.run(get_xpo_eta(tracking))
+        result = asyncio.run(get_xpo_eta(tracking))
+        print(result)
+        if result.status == NOT_FOUND:
+            print(result.raw_text)
     else:
-        print("Usage: python xpo.py <tracking_number>")
\ No newline at end of file
+        print("Usage: python xpo.py <tracking_number>")